@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+import threading
+
+from cache import named_caches
+from shared_cache import shared_cache
+
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", "3600"))
+
+
+def fingerprint(model, params, prompt):
+    # Prompts are f-string templates, so indentation and blank lines are noise
+    normalized = ' '.join(prompt.split())
+    payload = json.dumps({'model': model, 'params': params, 'prompt': normalized}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """Finished analyses by prompt fingerprint. They live only in the shared
+    tier, under its size cap and eviction, so every worker reuses them."""
+
+    def __init__(self, store, ttl):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self.store.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[0]
+
+    def set(self, key, text):
+        self.store.set(key, text, self.ttl)
+
+
+analysis_cache = AnalysisCache(shared_cache.namespace('analysis'), AI_CACHE_TTL)
+named_caches['analysis'] = analysis_cache
@@ -1,50 +1,128 @@
-from flask import Flask, render_template, request, jsonify
-import yfinance as yf
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
 import os
+import json
+import threading
+import time
 from dotenv import load_dotenv
-import requests
-import pandas as pd
-from datetime import datetime, timedelta
-from textblob import TextBlob
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
-import anthropic
+from concurrent.futures import wait, TimeoutError as FutureTimeoutError
+
+# Load .env before our own modules read their settings at import time
+load_dotenv()
+
+from concurrency import io_executor, SingleFlight
+from lazy import lazy_import
+from market_data import (
+    get_info, submit_info, get_history, get_close_matrix, get_indicators,
+    get_statements, peek_snapshot
+)
+from ai_cache import analysis_cache, fingerprint
+from indicators import compute_indicators, latest
+from news import fetch_articles, peek_articles
+from prefetch import prefetcher, PREFETCH_ENABLED
+from sectors import get_sector_performance, sector_performance, SECTOR_REFRESH_ENABLED
+from screener import (
+    screener, screen, parse_filters, available_universes, SCREENER_DEFAULT_UNIVERSE, SCREENER_MAX_RESULTS,
+    SCREENER_REFRESH_ENABLED
+)
+from payload import encode_series, gzip_response, payload_etag, delta_payload, recent_payloads, series_days
+from resilience import Deadline, gather
+from backtest import STRATEGIES, DEFAULT_GRIDS, METRICS, parse_values, build_grid, run_backtest, buy_and_hold
+from prompts import MODEL_ROUTES, build_full_analysis_prompt, build_qa_prompt
+from metrics import start_request, stage, timed, upstream_call, server_timing, request_seconds, render as render_metrics
 
 app = Flask(__name__)
 
-load_dotenv()
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
-NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+COMPETITOR_TIMEOUT = float(os.getenv("COMPETITOR_TIMEOUT", "3"))
+WATCHLIST_MAX_TICKERS = int(os.getenv("WATCHLIST_MAX_TICKERS", "100"))
+WATCHLIST_INFO_TIMEOUT = float(os.getenv("WATCHLIST_INFO_TIMEOUT", "2"))
+FULL_ANALYSIS_DEADLINE = float(os.getenv("FULL_ANALYSIS_DEADLINE", "90"))
+# Longest we wait on one Claude call attempt (the SDK default is 10 minutes).
+# Past the deadline a full analysis is left running so it gets cached, but it
+# must not hold an I/O worker indefinitely.
+ANTHROPIC_TIMEOUT = float(os.getenv("ANTHROPIC_TIMEOUT", "120"))
+# Share of the full analysis deadline, counted from the start of the request,
+# by which each stage must be done. The data stages run in parallel; the AI
+# analysis gets whatever is left once they are in.
+STAGE_DEADLINES = {
+    'overview': 0.15,
+    'financials': 0.15,
+    'technicals': 0.15,
+    'news': 0.15,
+    'competitors': 0.2,
+    'analysis': 1.0,
+}
+
+# anthropic and textblob take most of our import time; load them on first use
+# (or in the pre-fork master, see warmup.py)
+anthropic = lazy_import('anthropic')
+textblob = lazy_import('textblob')
+
+_client = None
+_client_lock = threading.Lock()
+# Identical prompts arriving together share one model call
+analysis_flights = SingleFlight()
 
-client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
+@app.before_request
+def start_background_jobs():
+    if PREFETCH_ENABLED:
+        prefetcher.start()
+    if SECTOR_REFRESH_ENABLED:
+        sector_performance.start()
+    if SCREENER_REFRESH_ENABLED:
+        screener.start()
+
+@app.before_request
+def start_timing():
+    start_request()
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def add_server_timing(response):
+    # Streamed responses only report the stages finished before the headers went out
+    start = g.request_start
+    timing = server_timing()
+    response.headers['Server-Timing'] = ', '.join(
+        filter(None, [timing, f"total;dur={(time.perf_counter() - start) * 1000:.1f}"])
+    )
+    endpoint, status = request.endpoint or 'unknown', response.status_code
+    response.call_on_close(lambda: request_seconds.observe(time.perf_counter() - start, endpoint, status))
+    return response
 
 @app.route('/')
 def index():
     return render_template('index.html')
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 @app.route('/get_stock_data', methods=['POST'])
 def get_stock_data():
     ticker = request.form['ticker']
-    stock = yf.Ticker(ticker)
+    prefetcher.record(ticker)
     
-    info = stock.info
-    history = stock.history(period="1y")
+    # Fan the independent upstream calls out onto the shared I/O pool
+    history_future = io_executor.submit(get_history, ticker, period="1y")
+    news_future = io_executor.submit(get_news_and_sentiment, ticker)
+    metrics_future = io_executor.submit(get_financial_metrics, ticker)
+    competitor_future = io_executor.submit(get_competitors, ticker)
+    
+    info = get_info(ticker)
+    history = history_future.result()
     
     # Calculate additional metrics
-    sma_50 = history['Close'].rolling(window=50).mean().iloc[-1]
-    sma_200 = history['Close'].rolling(window=200).mean().iloc[-1]
-    rsi = calculate_rsi(history['Close'])
+    technicals = get_indicators(ticker)
+    sma_50 = technicals['sma_50']
+    sma_200 = technicals['sma_200']
+    rsi = technicals['rsi']
     
     # Get sector data
     sector_performance = get_sector_performance(info.get('sector'))
     
-    # Get news and sentiment
-    news, sentiment = get_news_and_sentiment(ticker)
-    
-    # Get financial metrics
-    financial_metrics = get_financial_metrics(stock)
-    
-    # Get competitor analysis
-    competitor_analysis = get_competitor_analysis(stock)
+    news, sentiment = news_future.result()
+    financial_metrics = metrics_future.result()
+    competitors = competitor_future.result()
     
     data = {
         'name': info.get('longName', 'N/A'),
@@ -56,8 +134,6 @@ def get_stock_data():
         'forward_pe': info.get('forwardPE', 'N/A'),
         'dividend_yield': info.get('dividendYield', 'N/A'),
         'beta': info.get('beta', 'N/A'),
-        'historical_data': history['Close'].tolist(),
-        'historical_dates': history.index.strftime('%Y-%m-%d').tolist(),
         'sma_50': sma_50,
         'sma_200': sma_200,
         'rsi': rsi,
@@ -65,7 +141,7 @@ def get_stock_data():
         'news': news,
         'sentiment': sentiment,
         'financial_metrics': financial_metrics,
-        'competitors': competitor_analysis,
+        'competitors': competitors,
         'fiftyTwoWeekHigh': info.get('fiftyTwoWeekHigh', 'N/A'),
         'fiftyTwoWeekLow': info.get('fiftyTwoWeekLow', 'N/A'),
         'fiftyDayAverage': info.get('fiftyDayAverage', 'N/A'),
@@ -74,104 +150,413 @@ def get_stock_data():
         'eps': info.get('trailingEps', 'N/A'),
     }
     
-    return jsonify(data)
+    # Returning clients send the ETag of what they hold and the date of their
+    # last bar; they get a 304, or only the new bars and changed fields
+    days, closes = series_days(history.index), history['Close'].to_numpy()
+    etag = payload_etag(data, days, closes)
+    client_etags = request.if_none_match
+    if client_etags.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    recent_payloads.set(etag, (data, days, closes))
+    since = request.form.get('since')
+    previous = next(filter(None, map(recent_payloads.get, client_etags.as_set())), None)
+    start = 0
+    if since and previous is not None:
+        data, start = delta_payload(previous, (data, days, closes), since) or (data, 0)
+    
+    # The price series is only turned into lists when it is sent as JSON
+    sent = history.iloc[start:]
+    if request.form.get('format') == 'compact':
+        # Opt-in binary encoding of the price series; main.js expands it again
+        data = dict(data, historical=encode_series(sent.index, sent['Close'].to_numpy()))
+    else:
+        data = dict(data, historical_data=sent['Close'].tolist(),
+                    historical_dates=sent.index.strftime('%Y-%m-%d').tolist())
+    
+    response = jsonify(data)
+    response.set_etag(etag)
+    return gzip_response(response, request.headers.get('Accept-Encoding'))
 
-@app.route('/get_full_analysis', methods=['POST'])
-def get_full_analysis():
-    ticker = request.form['ticker']
+@app.route('/get_watchlist', methods=['POST'])
+def get_watchlist():
+    tickers = list(dict.fromkeys(t.strip().upper() for t in request.form['tickers'].replace(',', ' ').split()))
+    if not tickers:
+        return jsonify({"error": "No tickers given"}), 400
+    if len(tickers) > WATCHLIST_MAX_TICKERS:
+        return jsonify({"error": f"At most {WATCHLIST_MAX_TICKERS} tickers per request"}), 400
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        
-        with ThreadPoolExecutor() as executor:
-            financial_future = executor.submit(get_financial_analysis, stock)
-            technical_future = executor.submit(get_technical_analysis, stock)
-            news_sentiment_future = executor.submit(get_news_and_sentiment, ticker)
-            competitor_future = executor.submit(get_competitor_analysis, stock)
-        
-        financial_analysis = financial_future.result()
-        technical_analysis = technical_future.result()
-        news, sentiment = news_sentiment_future.result()
-        competitor_analysis = competitor_future.result()
+        # Names come from info, fetched in parallel while history is bulk-downloaded
+        info_futures = {ticker: submit_info(ticker) for ticker in tickers}
+        closes = get_close_matrix(tickers, period="1y")
+        values = latest(compute_indicators(closes, ema_spans=(), rsi_method='wilder'))
+        wait(info_futures.values(), timeout=WATCHLIST_INFO_TIMEOUT)
         
-        full_analysis_prompt = f"""
-        Provide a comprehensive analysis for {info.get('longName', ticker)} (Ticker: {ticker}):
-
-        1. Company Overview:
-        {info.get('longBusinessSummary', 'No business summary available.')}
-
-        2. Financial Analysis:
-        {financial_analysis}
-
-        3. Technical Analysis:
-        {technical_analysis}
-
-        4. News Sentiment:
-        Overall sentiment: {sentiment['overall']:.2f} (-1 to 1 scale)
-        Positive: {sentiment['positive']}, Neutral: {sentiment['neutral']}, Negative: {sentiment['negative']}
+        summaries = []
+        for i, ticker in enumerate(tickers):
+            future = info_futures[ticker]
+            info = future.result() if future.done() and future.exception() is None else {}
+            row = closes[i][~np.isnan(closes[i])]
+            summaries.append({
+                'ticker': ticker,
+                'name': info.get('longName', ticker),
+                'price': finite_or_none(row[-1]) if len(row) else None,
+                'change': finite_or_none(row[-1] / row[-2] - 1) if len(row) > 1 else None,
+                'sma_50': finite_or_none(values['sma_50'][i]),
+                'sma_200': finite_or_none(values['sma_200'][i]),
+                'rsi': finite_or_none(values['rsi'][i]),
+            })
+        return jsonify({"tickers": summaries})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        5. Competitor Analysis:
-        {competitor_analysis}
+@app.route('/screen', methods=['POST'])
+def screen_universe():
+    name = request.form.get('universe', SCREENER_DEFAULT_UNIVERSE)
+    try:
+        filters = parse_filters(request.form)
+        limit = min(int(request.form.get('limit', 50)), SCREENER_MAX_RESULTS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        universe = screener.get(name)
+    except KeyError:
+        return jsonify({"error": f"Unknown universe '{name}'", "universes": available_universes()}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    try:
+        matches, results = screen(universe, filters, request.form.get('sector'), request.form.get('sort', '-market_cap'), limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "universe": name,
+        "tickers": len(universe['tickers']),
+        "fundamentals_coverage": universe['fundamentals_coverage'],
+        "matches": matches,
+        "results": results
+    })
 
-        6. Recent News Headlines:
-        {' '.join([f"- {item['title']}" for item in news[:3]])}
+@app.route('/backtest', methods=['POST'])
+def backtest_strategy():
+    ticker = request.form['ticker'].strip().upper()
+    strategy = request.form.get('strategy', 'sma_cross')
+    # Not 'period', which is the RSI strategy's parameter
+    history_period = request.form.get('history', '10y')
+    # A metric to rank by, '-' first for highest first
+    sort = request.form.get('sort', '-sharpe')
+    try:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'; one of {', '.join(STRATEGIES)}")
+        if sort.lstrip('-') not in METRICS:
+            raise ValueError(f"Unknown sort metric '{sort}'; one of {', '.join(METRICS)}")
+        values = {name: parse_values(request.form.get(name, DEFAULT_GRIDS[strategy][name])) for name in STRATEGIES[strategy]}
+        top = min(int(request.form.get('top', 20)), 100)
+        cost = float(request.form.get('cost_bps', 0)) / 10000
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        history = get_history(ticker, period=history_period)
+        if history.empty:
+            return jsonify({"error": f"No price history for {ticker}"}), 404
+        closes = history['Close'].to_numpy()
+        try:
+            params = build_grid(strategy, values, len(closes))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        with stage('backtest'):
+            results = run_backtest(strategy, closes, params, cost)
+        key = results[sort.lstrip('-')]
+        order = np.argsort(-key if sort.startswith('-') else key, kind='stable')[:top]
+        return jsonify({
+            "ticker": ticker,
+            "strategy": strategy,
+            "start": history.index[0].strftime('%Y-%m-%d'),
+            "end": history.index[-1].strftime('%Y-%m-%d'),
+            "combinations": len(key),
+            "buy_and_hold": {metric: finite_or_none(value) for metric, value in buy_and_hold(closes).items()},
+            "results": [
+                dict({'params': {name: float(params[name][i]) for name in params}},
+                     **{metric: finite_or_none(results[metric][i]) for metric in METRICS})
+                for i in order
+            ]
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        Based on this information, provide:
-        1. A summary of the company's current position
-        2. Key strengths and weaknesses
-        3. Potential opportunities and threats
-        4. A short-term outlook (next 3-6 months)
-        5. A long-term outlook (1-3 years)
-        6. Recommendations for investors (buy, hold, or sell, with reasoning)
+def finite_or_none(value):
+    return float(value) if np.isfinite(value) else None
 
-        Please provide a balanced analysis, considering both bullish and bearish perspectives.
-        """
+@app.route('/get_full_analysis', methods=['POST'])
+def get_full_analysis():
+    ticker = request.form['ticker']
+    # depth=quick asks for a short take from the faster model
+    quick = request.form.get('depth') == 'quick'
+    route = MODEL_ROUTES['quick' if quick else 'report']
+    prefetcher.record(ticker)
+    deadline = Deadline(FULL_ANALYSIS_DEADLINE)
+    try:
+        # Whatever is not ready by its share of the deadline goes out as a placeholder
+        results, missing = {}, {}
+        for section, future in gather(submit_analysis_stages(ticker), deadline, STAGE_DEADLINES):
+            results[section] = stage_result(section, future, missing)
+        if len(missing) == len(results):
+            return jsonify({"error": f"No data could be loaded for {ticker}", "missing": missing}), 503
+        
+        news, sentiment = results['news']
+        full_analysis_prompt = build_full_analysis_prompt(
+            ticker, results['overview'], results['financials'], results['technicals'], news, sentiment,
+            results['competitors'], route['prompt_budget'], quick
+        )
         
+        analysis_future = io_executor.submit(generate_analysis, full_analysis_prompt, route)
         try:
-            message = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=4000,
-                temperature=0,
-                messages=[
-                    {"role": "user", "content": full_analysis_prompt}
-                ]
-            )
-            ai_analysis = message.content[0].text
+            with stage('claude'):
+                ai_analysis = analysis_future.result(timeout=deadline.remaining(STAGE_DEADLINES['analysis']))
+        except FutureTimeoutError:
+            # Left running: the finished analysis is cached for the next request
+            missing['analysis'] = 'timed out'
+            ai_analysis = "The AI analysis is taking longer than usual. Ask again shortly to see it."
         except Exception as e:
+            missing['analysis'] = str(e)
             ai_analysis = f"Unable to generate AI analysis. Error: {str(e)}"
         
         return jsonify({
             "analysis": ai_analysis,
-            "financials": financial_analysis,
-            "technicals": technical_analysis,
+            "financials": results['financials'],
+            "technicals": results['technicals'],
             "news": news,
             "sentiment": sentiment,
-            "competitors": competitor_analysis
+            "competitors": results['competitors'],
+            "partial": bool(missing),
+            "missing": missing
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def calculate_rsi(prices, period=14):
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs.iloc[-1]))
+@app.route('/get_full_analysis_stream')
+def get_full_analysis_stream():
+    ticker = request.args['ticker']
+    quick = request.args.get('depth') == 'quick'
+    route = MODEL_ROUTES['quick' if quick else 'report']
+    prefetcher.record(ticker)
+    deadline = Deadline(FULL_ANALYSIS_DEADLINE)
+    
+    def generate():
+        # Open the stream straight away so the client can render placeholders
+        yield sse_event('start', {'ticker': ticker})
+        
+        results, missing = {}, {}
+        for section, future in gather(submit_analysis_stages(ticker), deadline, STAGE_DEADLINES):
+            results[section] = stage_result(section, future, missing)
+            if section == 'overview':
+                payload = {'name': results[section].get('longName', ticker)}
+            elif section == 'news':
+                news, sentiment = results[section]
+                payload = {'news': news, 'sentiment': sentiment}
+            else:
+                payload = {'text': results[section]}
+            if section in missing:
+                payload['partial'] = True
+            yield sse_event(section, payload)
+        if len(missing) == len(results):
+            yield sse_event('error', {'error': f"No data could be loaded for {ticker}", 'missing': missing})
+            return
+        
+        news, sentiment = results['news']
+        full_analysis_prompt = build_full_analysis_prompt(
+            ticker, results['overview'], results['financials'], results['technicals'],
+            news, sentiment, results['competitors'], route['prompt_budget'], quick
+        )
+        
+        cache_key = fingerprint(route['model'], route['params'], full_analysis_prompt)
+        cached = analysis_cache.get(cache_key)
+        future, leader = (None, False) if cached is not None else analysis_flights.claim(cache_key)
+        if leader:
+            cached = analysis_cache.get(cache_key)
+            if cached is not None:
+                analysis_flights.finish(cache_key, future, cached)
+        if cached is not None or not leader:
+            # Served from the cache, or from an identical analysis already in flight
+            try:
+                with stage('claude'):
+                    text = cached if cached is not None else future.result(
+                        timeout=deadline.remaining(STAGE_DEADLINES['analysis'])
+                    )
+            except FutureTimeoutError:
+                missing['analysis'] = 'timed out'
+                text = "The AI analysis is taking longer than usual. Ask again shortly to see it."
+            except Exception as e:
+                missing['analysis'] = str(e)
+                text = f"Unable to generate AI analysis. Error: {str(e)}"
+            yield sse_event('analysis', {'text': text})
+            yield sse_event('done', {'cached': cached is not None, 'partial': bool(missing), 'missing': missing})
+            return
+        
+        text, error = None, RuntimeError("Analysis stream was interrupted")
+        try:
+            chunks, cut_short = [], False
+            with stage('claude'), upstream_call('anthropic'), get_client().messages.stream(
+                model=route['model'],
+                messages=[
+                    {"role": "user", "content": full_analysis_prompt}
+                ],
+                timeout=max(deadline.remaining(STAGE_DEADLINES['analysis']), 1.0),
+                **route['params']
+            ) as stream:
+                for chunk in stream.text_stream:
+                    chunks.append(chunk)
+                    yield sse_event('analysis', {'text': chunk})
+                    if not deadline.remaining(STAGE_DEADLINES['analysis']):
+                        # Our own limit, not an upstream failure: leave the stream
+                        # cleanly so the anthropic breaker does not count it
+                        cut_short = True
+                        break
+            if cut_short:
+                raise TimeoutError("The analysis ran past its time limit and was cut short")
+            text, error = ''.join(chunks), None
+            analysis_cache.set(cache_key, text)
+        except Exception as e:
+            error = e
+        finally:
+            # Also runs if the client disconnects mid-stream, so waiters never hang
+            analysis_flights.finish(cache_key, future, text, error)
+        
+        if error is not None:
+            missing['analysis'] = str(error)
+            yield sse_event('analysis', {'text': f"\n\nUnable to generate AI analysis. Error: {str(error)}"})
+        yield sse_event('done', {'partial': bool(missing), 'missing': missing})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
-def get_sector_performance(sector):
-    # This is a placeholder. In a real-world scenario, you'd fetch actual sector data
-    sectors = ['SPY', 'NASDAQ', 'DOW', 'FTSE', 'DAX', 'NIKKEI']
-    performances = np.random.uniform(-5, 5, len(sectors))
-    return dict(zip(sectors, performances))
+@app.route('/get_ai_analysis', methods=['POST'])
+def get_ai_analysis():
+    ticker = request.form['ticker'].strip().upper()
+    question = request.form.get('question', '').strip()
+    if not question:
+        return jsonify({"error": "No question given"}), 400
+    
+    # Answer from what the dashboard has already loaded; nothing here waits on an upstream fetch
+    info = peek_snapshot('info', ticker)
+    if info is None:
+        return jsonify({"error": f"Load {ticker} on the dashboard before asking about it"}), 404
+    headlines = [article['title'] for article in (peek_articles(ticker) or [])[:5]]
+    route = MODEL_ROUTES['qa']
+    prompt = build_qa_prompt(ticker, question, info, get_cached_technicals(ticker), headlines, route['prompt_budget'])
+    cache_key = fingerprint(route['model'], route['params'], prompt)
+    cached = analysis_cache.get(cache_key)
+    
+    def generate():
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        try:
+            with stage('claude'), upstream_call('anthropic'), get_client().messages.stream(
+                model=route['model'],
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                **route['params']
+            ) as stream:
+                for chunk in stream.text_stream:
+                    chunks.append(chunk)
+                    yield chunk
+        except Exception as e:
+            yield f"\n\nUnable to answer right now. Error: {str(e)}"
+            return
+        analysis_cache.set(cache_key, ''.join(chunks))
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/plain',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def get_cached_technicals(ticker):
+    history = peek_snapshot('history', ticker)
+    if history is None or history.empty:
+        return None
+    closes = history['Close'].to_numpy()
+    values = latest(compute_indicators(closes, ema_spans=(), rsi_method='wilder'))
+    return f"""
+    Last close ({history.index[-1]:%Y-%m-%d}): ${closes[-1]:.2f}
+    50-day SMA: ${values['sma_50']:.2f}
+    200-day SMA: ${values['sma_200']:.2f}
+    RSI (14-day): {values['rsi']:.2f}
+    1-year range: ${history['Low'].min():.2f} - ${history['High'].max():.2f}
+    1-year return: {values['cumulative_return'] * 100:.1f}%
+    """
+
+def get_client():
+    # Built per process on first use: its connection pool must not be shared across fork()
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = anthropic.Anthropic(api_key=CLAUDE_API_KEY, timeout=ANTHROPIC_TIMEOUT)
+    return _client
+
+def generate_analysis(prompt, route):
+    cache_key = fingerprint(route['model'], route['params'], prompt)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return analysis_flights.do(cache_key, lambda: create_analysis(cache_key, prompt, route))
+
+def create_analysis(cache_key, prompt, route):
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    with upstream_call('anthropic'):
+        message = get_client().messages.create(
+            model=route['model'],
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            **route['params']
+        )
+    text = message.content[0].text
+    analysis_cache.set(cache_key, text)
+    return text
+
+def submit_analysis_stages(ticker):
+    return {
+        io_executor.submit(get_info, ticker): 'overview',
+        io_executor.submit(get_financial_analysis, ticker): 'financials',
+        io_executor.submit(get_technical_analysis, ticker): 'technicals',
+        io_executor.submit(get_news_and_sentiment, ticker): 'news',
+        io_executor.submit(get_competitor_analysis, ticker): 'competitors',
+    }
+
+def stage_result(section, future, missing):
+    """A finished stage's result, or a stand-in of the same shape (recorded in
+    `missing`) for one that failed or was not done in time (future is None)."""
+    if future is not None and future.exception() is None:
+        return future.result()
+    missing[section] = 'timed out' if future is None else str(future.exception())
+    if section == 'overview':
+        return {}
+    if section == 'news':
+        return [], {'positive': 0, 'neutral': 0, 'negative': 0, 'overall': 0}
+    return f"{section.capitalize()} unavailable ({missing[section]})."
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
 def get_news_and_sentiment(ticker):
-    url = f"https://newsapi.org/v2/everything?q={ticker}&apiKey={NEWS_API_KEY}"
-    response = requests.get(url)
-    articles = response.json().get('articles', [])[:10]  # Get top 10 articles
+    with stage('news'):
+        # Keyed like prefetch and the Q&A peek, so 'aapl' finds what 'AAPL' cached
+        articles = fetch_articles(ticker.strip().upper())[:10]  # Get top 10 articles
     
     news = [{'title': article['title'], 'url': article['url'], 'date': article['publishedAt']} for article in articles]
     
-    sentiment_scores = [TextBlob(article['title']).sentiment.polarity for article in articles]
+    with stage('sentiment'):
+        sentiment_scores = [textblob.TextBlob(article['title']).sentiment.polarity for article in articles]
     overall_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0
     
     sentiment = {
@@ -183,22 +568,13 @@ def get_news_and_sentiment(ticker):
     
     return news, sentiment
 
-def get_financial_metrics(stock):
-    info = stock.info
-    financials = stock.financials
-    balance_sheet = stock.balance_sheet
-    cash_flow = stock.cash_flow
-    
-    # Helper function to safely get financial data
-    def safe_get(df, row, col):
-        try:
-            return df.loc[row, col]
-        except:
-            return None
+def get_financial_metrics(ticker):
+    info = get_info(ticker)
+    statements = get_statements(ticker)
 
     metrics = {
-        'Revenue': safe_get(financials, 'Total Revenue', financials.columns[0]),
-        'Net Income': safe_get(financials, 'Net Income', financials.columns[0]),
+        'Revenue': statements.get('Total Revenue'),
+        'Net Income': statements.get('Net Income'),
         'EPS': info.get('trailingEps'),
         'P/E Ratio': info.get('trailingPE'),
         'Forward P/E': info.get('forwardPE'),
@@ -206,22 +582,17 @@ def get_financial_metrics(stock):
         'Price to Book': info.get('priceToBook'),
         'Dividend Yield': info.get('dividendYield'),
         'Debt to Equity': info.get('debtToEquity'),
-        'Free Cash Flow': safe_get(cash_flow, 'Free Cash Flow', cash_flow.columns[0]),
-        'Current Ratio': safe_get(balance_sheet, 'Current Assets', balance_sheet.columns[0]) / 
-                         safe_get(balance_sheet, 'Current Liabilities', balance_sheet.columns[0])
-                         if safe_get(balance_sheet, 'Current Liabilities', balance_sheet.columns[0]) else None,
-        'Quick Ratio': (safe_get(balance_sheet, 'Current Assets', balance_sheet.columns[0]) - 
-                        safe_get(balance_sheet, 'Inventory', balance_sheet.columns[0])) / 
-                       safe_get(balance_sheet, 'Current Liabilities', balance_sheet.columns[0])
-                       if safe_get(balance_sheet, 'Current Liabilities', balance_sheet.columns[0]) else None,
+        'Free Cash Flow': statements.ratio('free_cash_flow'),
+        'Current Ratio': statements.ratio('current_ratio'),
+        'Quick Ratio': statements.ratio('quick_ratio'),
         'ROE': info.get('returnOnEquity'),
         'ROA': info.get('returnOnAssets'),
         'Profit Margin': info.get('profitMargins')
     }
     
     return {k: v for k, v in metrics.items() if v is not None}
-def get_financial_analysis(stock):
-    metrics = get_financial_metrics(stock)
+def get_financial_analysis(ticker):
+    metrics = get_financial_metrics(ticker)
     
     analysis = "Financial Analysis:\n\n"
     for key, value in metrics.items():
@@ -238,12 +609,13 @@ def get_financial_analysis(stock):
     
     return analysis
 
-def get_technical_analysis(stock):
-    history = stock.history(period="1y")
+def get_technical_analysis(ticker):
+    history = get_history(ticker, period="1y")
     current_price = history['Close'].iloc[-1]
-    sma_50 = history['Close'].rolling(window=50).mean().iloc[-1]
-    sma_200 = history['Close'].rolling(window=200).mean().iloc[-1]
-    rsi = calculate_rsi(history['Close'])
+    technicals = get_indicators(ticker)
+    sma_50 = technicals['sma_50']
+    sma_200 = technicals['sma_200']
+    rsi = technicals['rsi']
     
     analysis = f"""
     Technical Analysis:
@@ -259,24 +631,58 @@ def get_technical_analysis(stock):
     """
     return analysis
 
-def get_competitor_analysis(stock):
-    info = stock.info
+@timed('competitors')
+def get_competitors(ticker):
+    info = get_info(ticker)
     sector = info.get('sector', 'N/A')
-    industry = info.get('industry', 'N/A')
     
     # This is a placeholder. In a real-world scenario, you'd implement a more sophisticated competitor analysis
-    competitors = yf.Ticker(sector).info.get('componentsSymbols', [])[:5]  # Get top 5 competitors
+    symbols = get_info(sector).get('componentsSymbols', [])[:5]  # Get top 5 competitors
+    
+    # Look peers up concurrently; anything slower than the deadline is reported
+    # as pending and lands in the snapshot cache for the next request.
+    futures = {comp: submit_info(comp) for comp in symbols}
+    done, _ = wait(futures.values(), timeout=COMPETITOR_TIMEOUT)
+    
+    competitors = []
+    for comp, future in futures.items():
+        if future not in done:
+            competitors.append({'symbol': comp, 'name': comp, 'status': 'pending'})
+        elif future.exception() is not None:
+            competitors.append({'symbol': comp, 'name': comp, 'status': 'error'})
+        else:
+            comp_info = future.result()
+            competitors.append({
+                'symbol': comp,
+                'name': comp_info.get('longName', comp),
+                'price': comp_info.get('currentPrice'),
+                'marketCap': comp_info.get('marketCap'),
+                'peRatio': comp_info.get('trailingPE'),
+                'revenue': comp_info.get('totalRevenue'),
+                'status': 'ready',
+            })
+    return competitors
+
+def get_competitor_analysis(ticker):
+    info = get_info(ticker)
+    sector = info.get('sector', 'N/A')
+    industry = info.get('industry', 'N/A')
     
     analysis = f"Sector: {sector}\nIndustry: {industry}\n\nTop Competitors:\n"
     
-    for comp in competitors:
-        comp_stock = yf.Ticker(comp)
-        comp_info = comp_stock.info
+    for comp in get_competitors(ticker):
+        if comp['status'] != 'ready':
+            analysis += f"""
+        {comp['name']}: data {comp['status']}
+        """
+            continue
+        market_cap = f"${comp['marketCap']:,}" if comp['marketCap'] is not None else 'N/A'
+        revenue = f"${comp['revenue']:,}" if comp['revenue'] is not None else 'N/A'
         analysis += f"""
-        {comp_info.get('longName', comp)}:
-        Market Cap: ${comp_info.get('marketCap', 'N/A'):,}
-        P/E Ratio: {comp_info.get('trailingPE', 'N/A')}
-        Revenue (TTM): ${comp_info.get('totalRevenue', 'N/A'):,}
+        {comp['name']}:
+        Market Cap: {market_cap}
+        P/E Ratio: {comp['peRatio'] if comp['peRatio'] is not None else 'N/A'}
+        Revenue (TTM): {revenue}
         
         """
     
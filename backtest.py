@@ -0,0 +1,199 @@
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from indicators import bollinger_bands, rsi, sma
+
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+# Parameter sets evaluated per task; grids no bigger than this run in-process
+BACKTEST_CHUNK_SIZE = int(os.getenv("BACKTEST_CHUNK_SIZE", "500"))
+BACKTEST_MAX_COMBINATIONS = int(os.getenv("BACKTEST_MAX_COMBINATIONS", "20000"))
+TRADING_DAYS = 252
+
+# Parameters each strategy takes, in order
+STRATEGIES = {
+    # Long while the fast SMA is above the slow one
+    'sma_cross': ('fast', 'slow'),
+    # Long from RSI dropping below `lower` until it rises above `upper`
+    'rsi': ('period', 'lower', 'upper'),
+    # Long from a close above the upper band until a close below the middle one
+    'bollinger': ('window', 'num_std'),
+}
+# Grids used for any parameter a request leaves out
+DEFAULT_GRIDS = {
+    'sma_cross': {'fast': '5:50:5', 'slow': '50:250:10'},
+    'rsi': {'period': '14', 'lower': '20:40:5', 'upper': '60:80:5'},
+    'bollinger': {'window': '10:50:5', 'num_std': '1.5:3:0.5'},
+}
+# Parameters counted in bars
+WINDOW_PARAMETERS = ('fast', 'slow', 'period', 'window')
+METRICS = ('total_return', 'annual_return', 'volatility', 'sharpe', 'max_drawdown', 'exposure', 'trades')
+
+
+def _hold(entries, exits):
+    """Long (1.0) from each entry until the next exit, flat (0.0) otherwise,
+    along the last axis; an entry and exit on the same bar count as an entry.
+    The last signal is carried forward by index, so there is no loop over bars."""
+    signal = np.where(entries, 1.0, np.where(exits, 0.0, np.nan))
+    index = np.where(np.isnan(signal), 0, np.arange(signal.shape[-1]))
+    np.maximum.accumulate(index, axis=-1, out=index)
+    return np.nan_to_num(np.take_along_axis(signal, index, axis=-1))
+
+
+def _by_value(values, compute):
+    """compute(v) for each distinct v, stacked so row i belongs to values[i]."""
+    distinct, rows = np.unique(values, return_inverse=True)
+    return np.stack([compute(v) for v in distinct])[rows]
+
+
+def _positions(strategy, closes, params):
+    """(parameter sets x days) positions for one strategy; params holds one array per parameter."""
+    if strategy == 'sma_cross':
+        fast = _by_value(params['fast'], lambda w: sma(closes, int(w)))
+        slow = _by_value(params['slow'], lambda w: sma(closes, int(w)))
+        # NaN (a window not yet full) compares false, so those bars are flat
+        return (fast > slow).astype(np.float64)
+    if strategy == 'rsi':
+        # Wilder's RSI, as the watchlist and screener use. Its smoothing steps
+        # through the bars, so every distinct period goes through in one batch
+        periods, rows = np.unique(params['period'], return_inverse=True)
+        values = rsi(np.tile(closes, (len(periods), 1)), periods.astype(np.int64), method='wilder')[rows]
+        return _hold(values < params['lower'][:, None], values > params['upper'][:, None])
+    if strategy == 'bollinger':
+        middle = _by_value(params['window'], lambda w: sma(closes, int(w)))
+        # One-sigma band minus the middle is the rolling standard deviation
+        std = _by_value(params['window'], lambda w: bollinger_bands(closes, int(w), 1.0)[1]) - middle
+        return _hold(closes > middle + params['num_std'][:, None] * std, closes < middle)
+    raise ValueError(f"Unknown strategy '{strategy}'")
+
+
+def evaluate(positions, closes, cost=0.0):
+    """Performance of (parameter sets x days) long/flat positions, each taken
+    at a close and held over the next bar; `cost` is charged per unit of
+    position change, as a fraction of the price."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily = np.nan_to_num(closes[1:] / closes[:-1] - 1)
+    held = positions[..., :-1]
+    changes = np.abs(np.diff(positions, axis=-1, prepend=0.0))[..., :-1]
+    strategy_returns = held * daily - changes * cost
+    equity = np.cumprod(1 + strategy_returns, axis=-1)
+    total = equity[..., -1] - 1 if equity.shape[-1] else np.zeros(positions.shape[:-1])
+    years = max(strategy_returns.shape[-1], 1) / TRADING_DAYS
+    mean = strategy_returns.mean(axis=-1)
+    std = strategy_returns.std(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), 0.0)
+    peaks = np.maximum.accumulate(np.maximum(equity, 1.0), axis=-1)
+    return {
+        'total_return': total,
+        'annual_return': np.sign(1 + total) * np.abs(1 + total) ** (1 / years) - 1,
+        'volatility': std * np.sqrt(TRADING_DAYS),
+        'sharpe': sharpe,
+        'max_drawdown': (equity / peaks - 1).min(axis=-1) if equity.shape[-1] else np.zeros(positions.shape[:-1]),
+        'exposure': held.mean(axis=-1),
+        'trades': changes.sum(axis=-1),
+    }
+
+
+def _run_chunk(strategy, closes, params, cost):
+    return evaluate(_positions(strategy, closes, params), closes, cost)
+
+
+def parse_values(text):
+    """Parameter values from 'a,b,c' or an inclusive range 'start:stop:step'."""
+    values = []
+    for part in str(text).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if ':' in part:
+            start, stop, step = (float(x) for x in (part.split(':') + ['1'])[:3])
+            if not all(math.isfinite(x) for x in (start, stop, step)):
+                raise ValueError(f"Range bounds and step must be finite in '{part}'")
+            if step <= 0:
+                raise ValueError(f"Range step must be positive in '{part}'")
+            # Sized before anything is allocated, so '1:2e7:1' is refused rather than built
+            steps = (stop - start) / step
+            if not math.isfinite(steps) or len(values) + max(math.floor(steps + 0.5) + 1, 0) > BACKTEST_MAX_COMBINATIONS:
+                raise ValueError(f"At most {BACKTEST_MAX_COMBINATIONS} values per parameter")
+            values.extend(np.arange(start, stop + step / 2, step).round(10).tolist())
+        else:
+            value = float(part)
+            if not math.isfinite(value):
+                raise ValueError(f"Parameter values must be finite, not '{part}'")
+            values.append(value)
+        if len(values) > BACKTEST_MAX_COMBINATIONS:
+            raise ValueError(f"At most {BACKTEST_MAX_COMBINATIONS} values per parameter")
+    if not values:
+        raise ValueError("Empty parameter list")
+    return values
+
+
+def build_grid(strategy, values, bars):
+    """Every combination of the given values, {parameter: array}, dropping
+    ones that make no sense (fast >= slow, lower >= upper). Windows and
+    periods must be whole numbers of bars from 2 up to `bars`."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'")
+    names = STRATEGIES[strategy]
+    missing = [name for name in names if name not in values]
+    if missing:
+        raise ValueError(f"Missing parameters: {', '.join(missing)}")
+    for name in [name for name in names if name in WINDOW_PARAMETERS]:
+        invalid = [v for v in values[name] if v != int(v) or not 2 <= v <= bars]
+        if invalid:
+            raise ValueError(f"'{name}' must be a whole number from 2 to {bars} (the bars in the history), not {invalid[0]:g}")
+    size = np.prod([len(values[name]) for name in names])
+    if size > BACKTEST_MAX_COMBINATIONS:
+        raise ValueError(f"{size} combinations; at most {BACKTEST_MAX_COMBINATIONS} per backtest")
+    grid = np.array(list(itertools.product(*(values[name] for name in names))), dtype=np.float64).reshape(-1, len(names))
+    params = {name: grid[:, i] for i, name in enumerate(names)}
+    if strategy == 'sma_cross':
+        keep = params['fast'] < params['slow']
+    elif strategy == 'rsi':
+        keep = params['lower'] < params['upper']
+    else:
+        keep = np.ones(len(grid), dtype=bool)
+    return {name: column[keep] for name, column in params.items()}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    # Created on first use in the serving process, and with 'spawn' so no
+    # worker inherits the threads and locks of a running web process
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=BACKTEST_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def run_backtest(strategy, closes, params, cost=0.0):
+    """{metric: array} for every parameter set in `params` ({name: array}),
+    split into chunks evaluated in parallel across processes."""
+    closes = np.asarray(closes, dtype=np.float64)
+    size = len(next(iter(params.values()))) if params else 0
+    starts = range(0, size, BACKTEST_CHUNK_SIZE)
+    chunks = [{name: values[i:i + BACKTEST_CHUNK_SIZE] for name, values in params.items()} for i in starts]
+    if len(chunks) <= 1 or BACKTEST_WORKERS <= 1:
+        results = [_run_chunk(strategy, closes, chunk, cost) for chunk in chunks]
+    else:
+        pool = _get_pool()
+        results = list(pool.map(_run_chunk, *zip(*[(strategy, closes, chunk, cost) for chunk in chunks])))
+    if not results:
+        return {metric: np.array([]) for metric in METRICS}
+    return {metric: np.concatenate([result[metric] for result in results]) for metric in METRICS}
+
+
+def buy_and_hold(closes):
+    closes = np.asarray(closes, dtype=np.float64)
+    return {metric: float(value[0]) for metric, value in evaluate(np.ones((1, len(closes))), closes).items()}
@@ -0,0 +1,74 @@
+"""Time a parameter sweep through the backtest engine, in-process and across worker processes.
+
+    python benchmarks/bench_backtest.py --years 10 --combinations 10000
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest  # noqa: E402
+
+
+def synthetic_closes(days, seed):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, days)))
+
+
+def sweep_values(strategy, combinations):
+    """Roughly `combinations` parameter sets for a strategy, spread evenly over each parameter."""
+    names = backtest.STRATEGIES[strategy]
+    per_axis = max(2, math.ceil(combinations ** (1 / len(names))))
+    ranges = {
+        'fast': (2, 100), 'slow': (20, 400), 'period': (5, 30), 'lower': (10, 45), 'upper': (55, 90),
+        'window': (5, 100), 'num_std': (0.5, 3.5),
+    }
+    values = {}
+    for name in names:
+        low, high = ranges[name]
+        values[name] = np.linspace(low, high, per_axis).round(2)
+    if strategy == 'sma_cross':
+        # Keep the grid at the requested size after fast >= slow pairs are dropped
+        values['slow'] = np.linspace(110, 400, per_axis)
+    for name in set(names) & set(backtest.WINDOW_PARAMETERS):
+        values[name] = np.unique(values[name].round())
+    values = {name: column.tolist() for name, column in values.items()}
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--strategy', default='sma_cross', choices=list(backtest.STRATEGIES))
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--combinations', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=backtest.BACKTEST_WORKERS)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    closes = synthetic_closes(args.years * backtest.TRADING_DAYS, args.seed)
+    backtest.BACKTEST_MAX_COMBINATIONS = max(backtest.BACKTEST_MAX_COMBINATIONS, args.combinations * 2)
+    params = backtest.build_grid(args.strategy, sweep_values(args.strategy, args.combinations), len(closes))
+    size = len(next(iter(params.values())))
+    print(f"{args.strategy}: {size} combinations over {len(closes)} bars")
+
+    for workers in sorted({1, args.workers}):
+        backtest.BACKTEST_WORKERS = workers
+        if workers > 1:
+            # Start the pool outside the timing, as a long-running server would have
+            backtest._get_pool().submit(int).result()
+        start = time.perf_counter()
+        results = backtest.run_backtest(args.strategy, closes, params, cost=0.0005)
+        elapsed = time.perf_counter() - start
+        best = int(np.argmax(results['sharpe']))
+        print(f"{workers:>3} worker(s): {elapsed:6.2f}s  ({size / elapsed:,.0f} combinations/s), "
+              f"best sharpe {results['sharpe'][best]:.2f} at "
+              + ', '.join(f"{name}={params[name][best]:g}" for name in params))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Latency and throughput of the dashboard endpoints against local fake upstreams.
+
+Runs the Flask app in-process against FakeYFinance, FakeNewsAPI and
+FakeAnthropic (see fakes.py), so no network access is needed, and reports
+p50/p95/p99 latency and requests/sec per endpoint and concurrency level.
+
+    python benchmarks/bench_endpoints.py --concurrency 1,4,16 --requests 200
+    python benchmarks/bench_endpoints.py --cold --yf-latency-ms 150 --claude-failure-rate 0.05
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fakes import FakeAnthropic, FakeNewsAPI, FakeYFinance, UpstreamProfile  # noqa: E402
+from fixtures import recorded_tickers  # noqa: E402
+
+ENDPOINTS = {
+    'stock_data': lambda base, ticker: ('POST', f"{base}/get_stock_data", {'data': {'ticker': ticker}}),
+    'full_analysis': lambda base, ticker: ('POST', f"{base}/get_full_analysis", {'data': {'ticker': ticker}}),
+    'full_analysis_stream': lambda base, ticker: (
+        'GET', f"{base}/get_full_analysis_stream", {'params': {'ticker': ticker}, 'stream': True}
+    ),
+}
+
+
+def profile(args, name):
+    return UpstreamProfile(getattr(args, f"{name}_latency_ms"), getattr(args, f"{name}_jitter_ms"),
+                           getattr(args, f"{name}_failure_rate"), seed=args.seed)
+
+
+def start_app(args, tickers):
+    """Start the fakes, point the app at them and serve it on a local port."""
+    profiles = {name: profile(args, name) for name in ('yf', 'news', 'claude')}
+    yf = FakeYFinance(profiles['yf'], peers=tickers[:5])
+    news_server = FakeNewsAPI(profiles['news'], yf.fixtures).start()
+    claude_server = FakeAnthropic(profiles['claude'], args.output_tokens, args.token_interval_ms).start()
+
+    # The app reads its settings at import time
+    os.environ.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='stockcopilot-bench-'),
+        'NEWS_API_URL': news_server.url,
+        'NEWS_API_KEY': 'bench',
+        'ANTHROPIC_BASE_URL': claude_server.url,
+        'CLAUDE_API_KEY': 'bench',
+        'PREFETCH_ENABLED': '0',
+    })
+    import app
+    import market_data
+    import ohlcv_store
+    from werkzeug.serving import make_server
+
+    yf.install(market_data, ohlcv_store)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-app', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", profiles
+
+
+_sessions = threading.local()
+
+
+def call(base, endpoint, ticker):
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    method, url, kwargs = ENDPOINTS[endpoint](base, ticker)
+    start = time.perf_counter()
+    try:
+        with session.request(method, url, timeout=120, **kwargs) as response:
+            for _ in response.iter_content(chunk_size=None):
+                pass
+            ok = response.status_code < 400
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_level(base, endpoint, concurrency, tickers):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda ticker: call(base, endpoint, ticker), tickers))
+        elapsed = time.perf_counter() - start
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'endpoint': endpoint, 'concurrency': concurrency, 'requests': len(results),
+        'errors': sum(not ok for _, ok in results), 'p50': p50, 'p95': p95, 'p99': p99,
+        'rps': len(results) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--endpoints', default='stock_data,full_analysis',
+                        help=f"comma-separated, from {', '.join(ENDPOINTS)}")
+    parser.add_argument('--concurrency', default='1,4,16')
+    parser.add_argument('--requests', type=int, default=100, help="requests per endpoint and level")
+    parser.add_argument('--tickers', type=int, default=20,
+                        help="tickers to rotate through (recorded fixtures first, then synthetic)")
+    parser.add_argument('--cold', action='store_true',
+                        help="give every request a ticker no earlier request used, so all caches miss")
+    parser.add_argument('--seed', type=int, default=42)
+    for name, latency in (('yf', 80.0), ('news', 120.0), ('claude', 400.0)):
+        parser.add_argument(f'--{name}-latency-ms', type=float, default=latency)
+        parser.add_argument(f'--{name}-jitter-ms', type=float, default=latency / 4)
+        parser.add_argument(f'--{name}-failure-rate', type=float, default=0.0)
+    parser.add_argument('--output-tokens', type=int, default=400)
+    parser.add_argument('--token-interval-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    endpoints = args.endpoints.split(',')
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    recorded = recorded_tickers()
+    pool = (recorded + [f"SYN{i:03d}" for i in range(args.tickers)])[:args.tickers]
+    base, profiles = start_app(args, pool)
+    if not args.yf_failure_rate:
+        # The competitor fan-out is part of what is measured; fail loudly if the fakes stop feeding it
+        check = requests.post(f"{base}/get_stock_data", data={'ticker': pool[0]}, timeout=120).json()
+        assert check.get('competitors'), f"no competitors for {pool[0]}; the fake sector lookup is broken"
+
+    if not args.cold:
+        # Steady state: every ticker has been seen once before measuring
+        for endpoint in endpoints:
+            for ticker in pool:
+                call(base, endpoint, ticker)
+
+    print(f"{len(pool)} tickers ({len(set(pool) & set(recorded))} recorded), "
+          f"{'cold' if args.cold else 'warm'} caches, {args.requests} requests per level")
+    print(f"{'endpoint':<22}{'conc':>6}{'reqs':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for endpoint in endpoints:
+        for level in levels:
+            if args.cold:
+                tickers = [f"C{endpoints.index(endpoint)}L{level}X{i}" for i in range(args.requests)]
+            else:
+                tickers = [pool[i % len(pool)] for i in range(args.requests)]
+            r = run_level(base, endpoint, level, tickers)
+            print(f"{r['endpoint']:<22}{r['concurrency']:>6}{r['requests']:>7}{r['errors']:>8}"
+                  f"{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}{r['rps']:>9.1f}")
+
+    print("upstream calls (failed): " + ", ".join(
+        f"{name} {p.calls} ({p.failures})" for name, p in profiles.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Compare the NumPy indicator engine with the per-ticker pandas code it replaced.
+
+    python benchmarks/bench_indicators.py --tickers 500 --days 252
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import compute_indicators  # noqa: E402
+
+
+# Reference implementations, as previously found in app.py and archive/app_st.py
+def calculate_rsi(prices, period=14):
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def calculate_returns(df):
+    df['Daily_Return'] = df['Close'].pct_change()
+    df['Cumulative_Return'] = (1 + df['Daily_Return']).cumprod() - 1
+    return df
+
+
+def calculate_moving_averages(df, windows=[20, 50, 200]):
+    for window in windows:
+        df[f'MA_{window}'] = df['Close'].rolling(window=window).mean()
+    return df
+
+
+def calculate_bollinger_bands(df, window=20):
+    df['MA_20'] = df['Close'].rolling(window=window).mean()
+    df['BB_upper'] = df['MA_20'] + 2 * df['Close'].rolling(window=window).std()
+    df['BB_lower'] = df['MA_20'] - 2 * df['Close'].rolling(window=window).std()
+    return df
+
+
+def pandas_indicators(closes):
+    frames = []
+    for row in closes:
+        df = pd.DataFrame({'Close': row})
+        df = calculate_returns(df)
+        df = calculate_moving_averages(df)
+        df = calculate_bollinger_bands(df)
+        df['EMA_12'] = df['Close'].ewm(span=12, adjust=False).mean()
+        df['EMA_26'] = df['Close'].ewm(span=26, adjust=False).mean()
+        df['RSI'] = calculate_rsi(df['Close'])
+        frames.append(df)
+    return frames
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--days', type=int, default=252)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (args.tickers, args.days)), axis=1))
+
+    pandas_time, frames = best_of(lambda: pandas_indicators(closes), args.repeat)
+    single_time, _ = best_of(lambda: [compute_indicators(row) for row in closes], args.repeat)
+    batch_time, batch = best_of(lambda: compute_indicators(closes), args.repeat)
+
+    checks = {
+        'sma_50': 'MA_50', 'sma_200': 'MA_200', 'ema_12': 'EMA_12', 'ema_26': 'EMA_26', 'rsi': 'RSI',
+        'bb_upper': 'BB_upper', 'bb_lower': 'BB_lower',
+        'daily_return': 'Daily_Return', 'cumulative_return': 'Cumulative_Return',
+    }
+    for ours, theirs in checks.items():
+        expected = np.vstack([df[theirs].to_numpy() for df in frames])
+        if not np.allclose(batch[ours], expected, equal_nan=True, rtol=1e-7, atol=1e-9):
+            raise SystemExit(f"Mismatch in {ours}")
+
+    print(f"{args.tickers} tickers x {args.days} days, best of {args.repeat}")
+    print(f"  pandas, per ticker   {pandas_time * 1000:9.1f} ms")
+    print(f"  numpy, per ticker    {single_time * 1000:9.1f} ms  ({pandas_time / single_time:5.1f}x)")
+    print(f"  numpy, batched       {batch_time * 1000:9.1f} ms  ({pandas_time / batch_time:5.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Measure how long a web worker takes to serve its first request.
+
+Each scenario runs in a fresh interpreter so imports are not already cached:
+
+  cold    import app, then serve GET / and a first sentiment score
+  forked  import app and run the pre-fork warmup (as gunicorn's preloading
+          master does), then fork and time the child's first requests
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints one JSON line of timings in ms
+SCENARIO = r'''
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+mode = sys.argv[1]
+
+def first_requests():
+    import app
+    t0 = time.perf_counter()
+    with app.app.test_client() as client:
+        assert client.get('/').status_code == 200
+    t1 = time.perf_counter()
+    app.fetch_articles = lambda ticker: [{'title': 'Shares rally on strong results', 'url': '', 'publishedAt': ''}]
+    app.get_news_and_sentiment('BENCH')
+    return t0, t1, time.perf_counter()
+
+if mode == 'cold':
+    t0, t1, t2 = first_requests()
+    print(json.dumps({'import': (t0 - start) * 1000, 'first_request': (t1 - start) * 1000,
+                      'first_sentiment': (t2 - t1) * 1000}))
+else:
+    import app
+    try:
+        from warmup import warm_master
+    except ImportError:
+        warm_master = None
+    if warm_master is not None:
+        warm_master()
+    read, write = os.pipe()
+    forked = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        t0, t1, t2 = first_requests()
+        os.write(write, json.dumps({'import': (t0 - forked) * 1000, 'first_request': (t1 - forked) * 1000,
+                                    'first_sentiment': (t2 - t1) * 1000}).encode())
+        os._exit(0)
+    os.close(write)
+    data = b''
+    while chunk := os.read(read, 65536):
+        data += chunk
+    os.waitpid(pid, 0)
+    print(data.decode())
+'''
+
+
+def run(mode, env):
+    output = subprocess.run([sys.executable, '-c', SCENARIO, mode], cwd=REPO_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PREFETCH_ENABLED='0', CLAUDE_API_KEY=os.getenv('CLAUDE_API_KEY', 'bench'))
+    env.setdefault('DATA_DIR', os.path.join(REPO_DIR, 'data', 'bench-startup'))
+    print(f"median of {args.repeat} runs, ms")
+    print(f"{'scenario':<10}{'import':>10}{'first request':>16}{'first sentiment':>18}")
+    for mode in ('cold', 'forked'):
+        runs = [run(mode, env) for _ in range(args.repeat)]
+        median = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+        print(f"{mode:<10}{median['import']:>10.1f}{median['first_request']:>16.1f}{median['first_sentiment']:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""Local stand-ins for yfinance, NewsAPI and the Anthropic API.
+
+Each replays fixtures with a configurable latency and failure rate. The two
+HTTP services run as real servers on 127.0.0.1, so the app reaches them
+through its own sessions and SDK clients (NEWS_API_URL, ANTHROPIC_BASE_URL);
+yfinance is a library, so FakeYFinance replaces the module the app's data
+layer imported.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from fixtures import SECTORS, load_fixture
+
+PERIOD_UNITS = {'d': 'days', 'mo': 'months', 'y': 'years'}
+
+
+class UpstreamProfile:
+    """How a fake upstream behaves: mean latency, +/- jitter and failure rate."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, failure_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Sleep for one call's latency; True if the call should fail."""
+        with self._lock:
+            self.calls += 1
+            delay = max(self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms), 0.0)
+            failed = self._random.random() < self.failure_rate
+            self.failures += failed
+        time.sleep(delay / 1000)
+        return failed
+
+
+class FixtureSet:
+    def __init__(self):
+        self._fixtures = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker):
+        ticker = ticker.upper()
+        with self._lock:
+            fixture = self._fixtures.get(ticker)
+        if fixture is None:
+            fixture = load_fixture(ticker)
+            with self._lock:
+                fixture = self._fixtures.setdefault(ticker, fixture)
+        return fixture
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class FakeTicker:
+    def __init__(self, yf, ticker):
+        self._yf = yf
+        self.ticker = ticker
+
+    def _fixture(self):
+        if self._yf.profile.wait():
+            raise UpstreamError(f"Simulated yfinance failure for {self.ticker}")
+        return self._yf.fixtures.get(self.ticker)
+
+    @property
+    def info(self):
+        if self.ticker.upper() in {sector.upper() for sector in SECTORS}:
+            # The app looks peers up by asking for the sector's info, under
+            # the upper-cased key it uses for every symbol
+            if self._yf.profile.wait():
+                raise UpstreamError(f"Simulated yfinance failure for {self.ticker}")
+            return {'componentsSymbols': list(self._yf.peers)}
+        return dict(self._fixture()['info'])
+
+    @property
+    def financials(self):
+        return self._fixture()['financials'].copy()
+
+    @property
+    def balance_sheet(self):
+        return self._fixture()['balance_sheet'].copy()
+
+    @property
+    def cash_flow(self):
+        return self._fixture()['cash_flow'].copy()
+
+    def history(self, period=None, start=None, **kwargs):
+        return _window(self._fixture()['history'], period, start)
+
+
+class FakeYFinance:
+    """Enough of the yfinance module for market_data and ohlcv_store."""
+
+    def __init__(self, profile, peers=()):
+        self.profile = profile
+        self.peers = tuple(peers)
+        self.fixtures = FixtureSet()
+
+    def Ticker(self, ticker):
+        return FakeTicker(self, ticker)
+
+    def download(self, tickers, period=None, start=None, **kwargs):
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        if self.profile.wait():
+            raise UpstreamError("Simulated yfinance bulk download failure")
+        frames = {ticker: _window(self.fixtures.get(ticker)['history'], period, start) for ticker in tickers}
+        return pd.concat(frames, axis=1)
+
+    def install(self, *modules):
+        for module in modules:
+            module.yf = self
+
+
+def _window(history, period, start):
+    if start is not None:
+        return history[history.index >= pd.Timestamp(start)].copy()
+    if period in (None, 'max'):
+        return history.copy()
+    unit = 'mo' if period.endswith('mo') else period[-1]
+    offset = pd.DateOffset(**{PERIOD_UNITS[unit]: int(period[:-len(unit)])})
+    return history[history.index > history.index[-1] - offset].copy()
+
+
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, profile, fixtures, **options):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.profile = profile
+        self.fixtures = fixtures
+        self.options = options
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _NewsHandler(_Handler):
+    def do_GET(self):
+        if self.server.profile.wait():
+            self.send_json(503, {'status': 'error', 'code': 'unexpectedError', 'message': 'Simulated failure'})
+            return
+        query = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+        articles = self.server.fixtures.get(query)['articles'] if query else []
+        body = {'status': 'ok', 'totalResults': len(articles), 'articles': articles}
+        etag = '"%s"' % hashlib.sha256(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_json(200, body, {'ETag': etag})
+
+
+class FakeNewsAPI(_FakeServer):
+    """Serves /v2/everything?q=<ticker> from each ticker's fixture articles."""
+
+    def __init__(self, profile, fixtures):
+        super().__init__(_NewsHandler, profile, fixtures)
+
+    @property
+    def url(self):
+        return super().url + '/v2/everything'
+
+
+class _AnthropicHandler(_Handler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.server.profile.wait():
+            self.send_json(500, {'type': 'error', 'error': {'type': 'api_error', 'message': 'Simulated failure'}})
+            return
+        prompt = ''.join(
+            message['content'] if isinstance(message['content'], str)
+            else ''.join(block.get('text', '') for block in message['content'])
+            for message in request.get('messages', [])
+        )
+        tokens = self.server.options['output_tokens']
+        if request.get('max_tokens'):
+            tokens = min(tokens, request['max_tokens'])
+        words = [f"word{i % 97}" for i in range(tokens)]
+        usage = {'input_tokens': len(prompt) // 4, 'output_tokens': tokens}
+        message = {
+            'id': f"msg_{uuid.uuid4().hex[:24]}", 'type': 'message', 'role': 'assistant',
+            'model': request.get('model', 'fake'), 'stop_reason': 'end_turn', 'stop_sequence': None,
+        }
+        interval = self.server.options['token_interval_ms'] / 1000
+        if not request.get('stream'):
+            time.sleep(interval * tokens)
+            self.send_json(200, dict(message, content=[{'type': 'text', 'text': ' '.join(words)}], usage=usage))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self._event('message_start', {
+            'type': 'message_start',
+            'message': dict(message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1)),
+        })
+        self._event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                            'content_block': {'type': 'text', 'text': ''}})
+        for i, word in enumerate(words):
+            time.sleep(interval)
+            self._event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                'delta': {'type': 'text_delta', 'text': word if i == 0 else ' ' + word}})
+        self._event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        self._event('message_delta', {'type': 'message_delta',
+                                      'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                      'usage': {'output_tokens': tokens}})
+        self._event('message_stop', {'type': 'message_stop'})
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _event(self, event, data):
+        chunk = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        self.wfile.flush()
+
+
+class FakeAnthropic(_FakeServer):
+    """Answers /v1/messages, streamed or not, with filler text of a fixed length.
+
+    The profile's latency is the time to the first token; each further token
+    takes token_interval_ms."""
+
+    def __init__(self, profile, output_tokens=400, token_interval_ms=0.0):
+        super().__init__(_AnthropicHandler, profile, None,
+                         output_tokens=output_tokens, token_interval_ms=token_interval_ms)
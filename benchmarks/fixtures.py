@@ -0,0 +1,170 @@
+"""Upstream responses for the offline benchmarks.
+
+A fixture is one ticker's yfinance info, daily history and statements plus
+its NewsAPI articles, stored as benchmarks/fixtures/<TICKER>.json by
+record_fixtures.py. Tickers without a recording get deterministic synthetic
+data, so the suite also runs on a machine that has never been online.
+"""
+import hashlib
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+FIXTURE_DIR = os.getenv("BENCH_FIXTURE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+SECTORS = ('Technology', 'Healthcare', 'Financial Services', 'Energy', 'Consumer Cyclical')
+HISTORY_DAYS = 504
+STATEMENT_ROWS = {
+    'financials': ('Total Revenue', 'Net Income', 'Gross Profit', 'Operating Income'),
+    'balance_sheet': ('Total Assets', 'Current Assets', 'Current Liabilities', 'Inventory', 'Stockholders Equity'),
+    'cash_flow': ('Operating Cash Flow', 'Capital Expenditure', 'Free Cash Flow'),
+}
+HEADLINES = (
+    "{name} beats expectations as revenue climbs",
+    "Analysts cut {name} price target after weak guidance",
+    "{name} announces new product line",
+    "Is {name} stock a buy right now?",
+    "{name} shares slide on sector rotation",
+    "{name} expands buyback program",
+    "Regulators open inquiry into {name}",
+    "{name} CEO outlines growth strategy",
+    "{name} trading flat ahead of earnings",
+    "Strong demand lifts {name} outlook",
+    "{name} faces supply chain headwinds",
+    "Investors cheer {name} dividend increase",
+)
+
+
+def frame_to_json(frame):
+    return {
+        'index': [str(i) for i in frame.index],
+        'columns': [str(c) for c in frame.columns],
+        'data': [[None if pd.isna(v) else float(v) for v in row] for row in frame.to_numpy()],
+    }
+
+
+def frame_from_json(data, parse_index=False, parse_columns=False):
+    index = pd.DatetimeIndex(data['index'], name='Date') if parse_index else data['index']
+    columns = pd.DatetimeIndex(data['columns']) if parse_columns else data['columns']
+    return pd.DataFrame(np.array(data['data'], dtype=np.float64).reshape(len(index), len(columns)),
+                        index=index, columns=columns)
+
+
+def last_business_day(today=None):
+    day = today or date.today()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def _rng(ticker):
+    return np.random.default_rng(int(hashlib.sha256(ticker.encode('utf-8')).hexdigest()[:8], 16))
+
+
+def synthetic_fixture(ticker, days=HISTORY_DAYS):
+    rng = _rng(ticker)
+    name = f"{ticker.title()} Corp"
+    sector = SECTORS[int(rng.integers(len(SECTORS)))]
+
+    dates = pd.bdate_range(end=last_business_day(), periods=days, name='Date')
+    close = rng.uniform(20, 400) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+    open_ = close * (1 + rng.normal(0, 0.005, days))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.015, days))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.015, days))
+    volume = rng.integers(1_000_000, 50_000_000, days).astype(np.float64)
+    history = pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=dates)
+
+    revenue = rng.uniform(1e9, 2e11)
+    shares = rng.uniform(1e8, 1e10)
+    eps = revenue * rng.uniform(0.05, 0.25) / shares
+    info = {
+        'symbol': ticker,
+        'longName': name,
+        'sector': sector,
+        'industry': f"{sector} Services",
+        'currentPrice': float(close[-1]),
+        'regularMarketChangePercent': float(close[-1] / close[-2] - 1),
+        'volume': int(volume[-1]),
+        'averageVolume': int(volume[-90:].mean()),
+        'marketCap': int(close[-1] * shares),
+        'trailingPE': float(close[-1] / eps),
+        'forwardPE': float(close[-1] / (eps * 1.1)),
+        'trailingEps': float(eps),
+        'pegRatio': float(rng.uniform(0.5, 3)),
+        'priceToBook': float(rng.uniform(1, 15)),
+        'dividendYield': float(rng.uniform(0, 0.04)),
+        'debtToEquity': float(rng.uniform(10, 200)),
+        'returnOnEquity': float(rng.uniform(0.02, 0.4)),
+        'returnOnAssets': float(rng.uniform(0.01, 0.2)),
+        'profitMargins': float(rng.uniform(0.02, 0.3)),
+        'beta': float(rng.uniform(0.5, 2)),
+        'totalRevenue': int(revenue),
+        'fiftyTwoWeekHigh': float(high[-252:].max()),
+        'fiftyTwoWeekLow': float(low[-252:].min()),
+        'fiftyDayAverage': float(close[-50:].mean()),
+        'twoHundredDayAverage': float(close[-200:].mean()),
+    }
+
+    year_ends = pd.DatetimeIndex([pd.Timestamp(last_business_day().year - i - 1, 12, 31) for i in range(4)])
+    statements = {}
+    for kind, rows in STATEMENT_ROWS.items():
+        values = revenue * rng.uniform(0.05, 1.0, (len(rows), len(year_ends)))
+        statements[kind] = pd.DataFrame(values, index=list(rows), columns=year_ends)
+
+    published = pd.Timestamp(last_business_day())
+    articles = [{
+        'title': headline.format(name=name),
+        'url': f"https://news.example.com/{ticker.lower()}/{i}",
+        'publishedAt': (published - pd.Timedelta(hours=7 * i)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'source': {'name': 'Example News'},
+    } for i, headline in enumerate(HEADLINES)]
+
+    return {'ticker': ticker, 'info': info, 'history': history, 'articles': articles, **statements}
+
+
+def fixture_path(ticker):
+    return os.path.join(FIXTURE_DIR, f"{ticker.upper()}.json")
+
+
+def save_fixture(fixture, directory=FIXTURE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    data = {
+        'ticker': fixture['ticker'],
+        'info': fixture['info'],
+        'history': frame_to_json(fixture['history']),
+        'articles': fixture['articles'],
+    }
+    for kind in STATEMENT_ROWS:
+        data[kind] = frame_to_json(fixture[kind])
+    with open(os.path.join(directory, f"{fixture['ticker'].upper()}.json"), 'w') as f:
+        json.dump(data, f, default=str)
+
+
+def load_fixture(ticker):
+    """The recorded fixture for a ticker, or a synthetic one if there is none.
+
+    Recorded history is shifted forward by whole weeks so its last bar is
+    recent and the OHLCV store treats it as current."""
+    try:
+        with open(fixture_path(ticker)) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return synthetic_fixture(ticker.upper())
+
+    history = frame_from_json(data['history'], parse_index=True)
+    if len(history):
+        lag = (last_business_day() - history.index[-1].date()).days
+        history.index = history.index + pd.Timedelta(days=lag // 7 * 7)
+    fixture = {'ticker': data['ticker'], 'info': data['info'], 'history': history, 'articles': data['articles']}
+    for kind in STATEMENT_ROWS:
+        fixture[kind] = frame_from_json(data[kind], parse_columns=True)
+    return fixture
+
+
+def recorded_tickers():
+    try:
+        return sorted(name[:-5] for name in os.listdir(FIXTURE_DIR) if name.endswith('.json'))
+    except FileNotFoundError:
+        return []
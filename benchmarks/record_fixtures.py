@@ -0,0 +1,60 @@
+"""Record live yfinance and NewsAPI responses as benchmark fixtures.
+
+Needs network access (and NEWS_API_KEY for articles); the benchmarks that
+replay the fixtures do not.
+
+    python benchmarks/record_fixtures.py AAPL MSFT NVDA
+"""
+import argparse
+import os
+import sys
+
+import requests
+import yfinance as yf
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FIXTURE_DIR, save_fixture  # noqa: E402
+
+
+def record(ticker, news_url, news_key):
+    stock = yf.Ticker(ticker)
+    history = stock.history(period='2y', auto_adjust=True)
+    if getattr(history.index, 'tz', None) is not None:
+        history.index = history.index.tz_localize(None)
+    articles = []
+    if news_key:
+        response = requests.get(news_url, params={'q': ticker}, headers={'X-Api-Key': news_key}, timeout=10)
+        response.raise_for_status()
+        articles = response.json().get('articles', [])
+    return {
+        'ticker': ticker,
+        'info': stock.info,
+        'history': history[['Open', 'High', 'Low', 'Close', 'Volume']],
+        'financials': stock.financials,
+        'balance_sheet': stock.balance_sheet,
+        'cash_flow': stock.cash_flow,
+        'articles': articles,
+    }
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--out', default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    news_url = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+    news_key = os.getenv("NEWS_API_KEY")
+    if not news_key:
+        print("NEWS_API_KEY is not set; recording without articles")
+    for ticker in args.tickers:
+        ticker = ticker.upper()
+        save_fixture(record(ticker, news_url, news_key), args.out)
+        print(f"Recorded {ticker}")
+
+
+if __name__ == '__main__':
+    main()
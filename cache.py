@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from concurrency import SingleFlight
+
+# Where on-disk caches and stores live
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+_MISSING = object()
+
+# Caches created with a name, by name, for reporting hit rates
+named_caches = {}
+
+
+class TTLCache:
+    """In-process LRU cache with per-entry expiry. With `shared` (a
+    shared_cache.SharedNamespace) it is the first tier in front of the
+    cross-worker cache: misses here are looked up there before loading, and
+    every set is written through so other workers pick it up."""
+
+    def __init__(self, maxsize=256, ttl=300, name=None, shared=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        if name is not None:
+            named_caches[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        value = self._get_shared(key)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.shared_hits += 1
+            return value
+
+    def _get_shared(self, key):
+        # Another worker's fresh entry, copied into this tier for the time it has left
+        entry = self.shared.get(key) if self.shared is not None else None
+        if entry is None:
+            return _MISSING
+        value, remaining = entry
+        self._set_local(key, value, remaining)
+        return value
+
+    def peek(self, key, default=None):
+        """The stored value even if it has expired, without counting a lookup
+        or touching LRU order; for callers that must not trigger a load."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING:
+            return entry[0]
+        entry = self.shared.get(key, stale=True) if self.shared is not None else None
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self._set_local(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def _set_local(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Cached value or loader(); `ttl` may be a function of the loaded value."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # Concurrent misses on the same key share a single load
+            value = self._flights.do(key, lambda: self._load(key, loader, ttl))
+        return value
+
+    def _load(self, key, loader, ttl=None):
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            # Filled by a load that finished between our miss and taking the flight
+            return entry[0]
+        value = self._get_shared(key)
+        if value is not _MISSING:
+            # or by another worker
+            return value
+        return self._reload(key, loader, ttl)
+
+    def refresh(self, key, loader, ttl=None):
+        """Reload a key now, even if the cached value is still fresh."""
+        return self._flights.do(key, lambda: self._reload(key, loader, ttl))
+
+    def _reload(self, key, loader, ttl=None):
+        value = loader()
+        self.set(key, value, ttl=ttl(value) if callable(ttl) else ttl)
+        return value
+
+    def ttl_remaining(self, key):
+        """Seconds until the key expires (negative once it has), or None if absent."""
+        with self._lock:
+            entry = self._data.get(key)
+        remaining = None if entry is None else entry[1] - time.monotonic()
+        if self.shared is not None:
+            # Another worker may already have refreshed it
+            shared_remaining = self.shared.ttl_remaining(key)
+            if shared_remaining is not None and (remaining is None or shared_remaining > remaining):
+                remaining = shared_remaining
+        return remaining
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
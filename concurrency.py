@@ -0,0 +1,94 @@
+import contextvars
+import fcntl
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+IO_QUEUE_SIZE = int(os.getenv("IO_QUEUE_SIZE", "64"))
+PEER_WORKERS = int(os.getenv("PEER_WORKERS", "8"))
+
+
+class BoundedExecutor:
+    """Thread pool whose submit() blocks once max_workers + queue_size tasks are in flight."""
+
+    def __init__(self, max_workers, queue_size, thread_name_prefix=''):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+
+    def submit(self, fn, *args, **kwargs):
+        self._slots.acquire()
+        try:
+            # Run in a copy of the caller's context so request-scoped state follows the task
+            future = self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls by key: the first caller does the work and
+    everyone who arrives while it is running gets the same result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def claim(self, key):
+        """Return (future, leader). The leader must call finish() exactly once."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def finish(self, key, future, result=None, exception=None):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, future, exception=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive flock on `path` (created if missing), for state on disk that
+    every worker process on the host reads and writes."""
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def temp_path(path):
+    """A temporary name next to `path` that no other thread or process writes to."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+io_executor = BoundedExecutor(IO_WORKERS, IO_QUEUE_SIZE, thread_name_prefix='io')
+# Competitor lookups are submitted from tasks already running on io_executor,
+# so they get their own pool rather than waiting on a slot in the same one.
+peer_executor = BoundedExecutor(PEER_WORKERS, IO_QUEUE_SIZE, thread_name_prefix='peer')
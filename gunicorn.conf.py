@@ -0,0 +1,24 @@
+# gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# Full analyses stream for up to a minute or two
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+
+# Import the app once in the master and fork workers from it, so new workers
+# start serving without re-importing anything.
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker forks
+    from warmup import warm_master
+    warm_master()
+
+
+def post_fork(server, worker):
+    from warmup import warm_worker
+    warm_worker()
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+
+from cache import DATA_DIR
+from concurrency import temp_path
+from ohlcv_store import is_valid_symbol, ohlcv_store
+
+INDICATOR_STATE_DIR = os.getenv("INDICATOR_STATE_DIR", os.path.join(DATA_DIR, "indicators"))
+SMA_WINDOWS = (50, 200)
+RSI_PERIOD = 14
+# Running sums pick up floating point drift; rebuild them from the window this often
+RESUM_INTERVAL = 1000
+
+
+class IndicatorState:
+    """Running SMA sums and Wilder-smoothed RSI, updated in O(1) per settled bar."""
+
+    def __init__(self, sma_windows=SMA_WINDOWS, rsi_period=RSI_PERIOD):
+        self.sma_windows = tuple(sma_windows)
+        self.rsi_period = rsi_period
+        self.capacity = max(self.sma_windows)
+        self.buffer = [0.0] * self.capacity
+        self.count = 0
+        self.sums = {window: 0.0 for window in self.sma_windows}
+        self.last_date = None
+        self.last_close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.generation = None
+
+    def _close_ago(self, n):
+        # Close n bars before the next one to be added
+        return self.buffer[(self.count - n) % self.capacity]
+
+    def update(self, bar_date, close):
+        for window in self.sma_windows:
+            self.sums[window] += close
+            if self.count >= window:
+                self.sums[window] -= self._close_ago(window)
+        if self.last_close is not None:
+            self.avg_gain, self.avg_loss = self._smoothed(close)
+        self.buffer[self.count % self.capacity] = close
+        self.count += 1
+        self.last_close = close
+        self.last_date = bar_date
+        if self.count % RESUM_INTERVAL == 0:
+            for window in self.sma_windows:
+                self.sums[window] = sum(self._close_ago(n) for n in range(1, min(window, self.count) + 1))
+
+    def _smoothed(self, close):
+        delta = close - self.last_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        moves = self.count - 1
+        if moves < self.rsi_period:
+            # Still seeding: plain average of the first rsi_period moves
+            return (self.avg_gain * moves + gain) / (moves + 1), (self.avg_loss * moves + loss) / (moves + 1)
+        period = self.rsi_period
+        return (self.avg_gain * (period - 1) + gain) / period, (self.avg_loss * (period - 1) + loss) / period
+
+    def values(self, close=None):
+        """Indicator values, optionally with a provisional latest close that is not committed."""
+        count = self.count
+        result = {}
+        for window in self.sma_windows:
+            total = self.sums[window]
+            if close is not None:
+                total += close
+                if count >= window:
+                    total -= self._close_ago(window)
+                result[f'sma_{window}'] = total / window if count + 1 >= window else float('nan')
+            else:
+                result[f'sma_{window}'] = total / window if count >= window else float('nan')
+
+        avg_gain, avg_loss, moves = self.avg_gain, self.avg_loss, count - 1
+        if close is not None and self.last_close is not None:
+            avg_gain, avg_loss = self._smoothed(close)
+            moves += 1
+        if moves < self.rsi_period:
+            result['rsi'] = float('nan')
+        elif avg_loss == 0:
+            result['rsi'] = 100.0 if avg_gain > 0 else float('nan')
+        else:
+            result['rsi'] = 100 - (100 / (1 + avg_gain / avg_loss))
+        return result
+
+    def to_dict(self):
+        return dict(vars(self), sums={str(k): v for k, v in self.sums.items()})
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['sma_windows'], data['rsi_period'])
+        state.__dict__.update(data)
+        state.sma_windows = tuple(data['sma_windows'])
+        state.sums = {int(k): v for k, v in data['sums'].items()}
+        return state
+
+
+class IndicatorStateStore:
+    """Keeps one IndicatorState per ticker in memory and mirrors it to disk so
+    other workers and later processes can pick up where this one left off."""
+
+    def __init__(self, root):
+        self.root = root
+        self._states = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, ticker):
+        with self._locks_lock:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _path(self, ticker):
+        if not is_valid_symbol(ticker):
+            raise ValueError(f"Invalid ticker symbol '{ticker}'")
+        return os.path.join(self.root, ticker + '.json')
+
+    def _load(self, ticker):
+        try:
+            with open(self._path(ticker)) as f:
+                return IndicatorState.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, ticker, state):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(ticker)
+        tmp = temp_path(path)
+        with open(tmp, 'w') as f:
+            json.dump(state.to_dict(), f)
+        os.replace(tmp, path)
+
+    def get(self, ticker):
+        """Current indicators for a ticker, feeding the state only the bars it has not seen."""
+        with self._lock(ticker):
+            state = self._states.get(ticker) or self._load(ticker)
+            after = state.last_date if state is not None else None
+            generation, bars = ohlcv_store.read(ticker, names=('Date', 'Close'), after=after)
+            if state is None or state.generation != generation:
+                # New ticker, or the store was reseeded and the old sums no longer apply
+                state = IndicatorState()
+                state.generation = generation
+                if after is not None:
+                    generation, bars = ohlcv_store.read(ticker, names=('Date', 'Close'))
+            self._states[ticker] = state
+            if len(bars['Date']) == 0:
+                return state.values()
+
+            # Everything but the newest bar is settled; the newest may still be
+            # an open session, so it is applied provisionally and not stored.
+            settled_dates, settled_closes = bars['Date'][:-1].tolist(), bars['Close'][:-1].tolist()
+            for bar_date, close in zip(settled_dates, settled_closes):
+                state.update(bar_date, close)
+            if settled_dates:
+                self._save(ticker, state)
+            return state.values(float(bars['Close'][-1]))
+
+
+indicator_states = IndicatorStateStore(INDICATOR_STATE_DIR)
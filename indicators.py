@@ -0,0 +1,161 @@
+import numpy as np
+
+# All functions take a 1-D series of closes or a 2-D (tickers x days) array and
+# work along the last axis, returning arrays of the same shape with NaN where a
+# window is not yet full (the same convention as pandas' rolling()).
+
+
+def _window_sums(values, window):
+    """Trailing-window sums, NaN until a window holds `window` non-NaN values."""
+    valid = ~np.isnan(values)
+    zero_filled = np.where(valid, values, 0.0)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    sums = np.pad(np.cumsum(zero_filled, axis=-1), pad)
+    counts = np.pad(np.cumsum(valid, axis=-1), pad)
+    window_sums = sums[..., window:] - sums[..., :-window]
+    window_counts = counts[..., window:] - counts[..., :-window]
+    head = np.full(values.shape[:-1] + (min(window - 1, values.shape[-1]),), np.nan)
+    full = window_counts == window
+    return np.concatenate([head, np.where(full, window_sums, np.nan)], axis=-1)
+
+
+def sma(values, window):
+    values = np.asarray(values, dtype=np.float64)
+    return _window_sums(values, window) / window
+
+
+def ema(values, span):
+    """Exponential moving average matching pandas ewm(span=span, adjust=False)."""
+    values = np.asarray(values, dtype=np.float64)
+    alpha = 2.0 / (span + 1.0)
+    if values.ndim == 1:
+        return _ema_1d(values, alpha)
+    out = np.empty_like(values)
+    current = values[..., 0].copy()
+    out[..., 0] = current
+    # Recursive in time but vectorised across tickers
+    for t in range(1, values.shape[-1]):
+        x = values[..., t]
+        current = np.where(np.isnan(current), x, np.where(np.isnan(x), current, current + alpha * (x - current)))
+        out[..., t] = current
+    return out
+
+
+def _ema_1d(values, alpha):
+    # Plain floats are much cheaper than 0-d arrays for a single series
+    out = []
+    current = float('nan')
+    for x in values.tolist():
+        if current != current:
+            current = x
+        elif x == x:
+            current += alpha * (x - current)
+        out.append(current)
+    return np.array(out)
+
+
+def _gains_losses(values):
+    delta = np.diff(values, axis=-1, prepend=np.nan)
+    # Matches delta.where(delta > 0, 0): the leading NaN counts as no move
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    return gains, losses
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def rsi(values, period=14, method='sma'):
+    """RSI from simple rolling means of gains/losses ('sma', as calculate_rsi
+    has always done) or from Wilder's smoothing ('wilder'). For 'wilder',
+    `period` may also be an array holding one period per series."""
+    values = np.asarray(values, dtype=np.float64)
+    if method == 'sma':
+        gains, losses = _gains_losses(values)
+        return _rsi_from_averages(sma(gains, period), sma(losses, period))
+    if method != 'wilder':
+        raise ValueError(f"Unknown RSI method: {method}")
+
+    # Each series is seeded from its own first `period` moves, so NaN-padded
+    # rows in a batch (shorter histories) are handled like their 1-D form.
+    delta = np.diff(values, axis=-1, prepend=np.nan)
+    avg_gain = np.full_like(values, np.nan)
+    avg_loss = np.full_like(values, np.nan)
+    gain = np.zeros(values.shape[:-1])
+    loss = np.zeros(values.shape[:-1])
+    moves = np.zeros(values.shape[:-1])
+    for t in range(1, values.shape[-1]):
+        d = delta[..., t]
+        valid = ~np.isnan(d)
+        moves = moves + valid
+        divisor = np.where(moves <= period, np.maximum(moves, 1), period)
+        gain = np.where(valid, gain + (np.where(d > 0, d, 0.0) - gain) / divisor, gain)
+        loss = np.where(valid, loss + (np.where(d < 0, -d, 0.0) - loss) / divisor, loss)
+        ready = moves >= period
+        avg_gain[..., t] = np.where(ready, gain, np.nan)
+        avg_loss[..., t] = np.where(ready, loss, np.nan)
+    return _rsi_from_averages(avg_gain, avg_loss)
+
+
+def bollinger_bands(values, window=20, num_std=2.0):
+    """Middle, upper and lower bands using the sample standard deviation."""
+    values = np.asarray(values, dtype=np.float64)
+    return _bollinger(values, window, num_std, sma(values, window))
+
+
+def _bollinger(values, window, num_std, middle):
+    # Centre each series first so the sum-of-squares trick keeps its precision
+    valid = ~np.isnan(values)
+    offset = np.where(valid, values, 0.0).sum(axis=-1, keepdims=True) / np.maximum(valid.sum(axis=-1, keepdims=True), 1)
+    centred = values - offset
+    sums = _window_sums(centred, window)
+    squares = _window_sums(centred * centred, window)
+    variance = np.maximum(squares - sums * sums / window, 0.0) / (window - 1)
+    std = np.sqrt(variance)
+    return middle, middle + num_std * std, middle - num_std * std
+
+
+def returns(values):
+    """Daily and cumulative simple returns, as pct_change() and cumprod() give."""
+    values = np.asarray(values, dtype=np.float64)
+    daily = np.full_like(values, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily[..., 1:] = values[..., 1:] / values[..., :-1] - 1
+    growth = np.cumprod(np.where(np.isnan(daily), 1.0, 1.0 + daily), axis=-1)
+    cumulative = np.where(np.isnan(daily), np.nan, growth - 1)
+    return daily, cumulative
+
+
+def trailing_returns(values, periods):
+    """Simple return of the last value over each lookback in `periods` (bars),
+    stacked on a new last axis; NaN where the series is shorter than the lookback."""
+    values = np.asarray(values, dtype=np.float64)
+    periods = np.asarray(periods)
+    positions = values.shape[-1] - 1 - periods
+    base = values[..., np.clip(positions, 0, None)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = values[..., -1:] / base - 1
+    return np.where(positions >= 0, result, np.nan)
+
+
+def compute_indicators(values, sma_windows=(50, 200), ema_spans=(12, 26), rsi_period=14,
+                       rsi_method='sma', bb_window=20, bb_std=2.0):
+    """Every dashboard indicator for one series or a (tickers x days) batch."""
+    values = np.asarray(values, dtype=np.float64)
+    result = {}
+    for window in sorted(set(sma_windows) | {bb_window}):
+        result[f'sma_{window}'] = sma(values, window)
+    for span in ema_spans:
+        result[f'ema_{span}'] = ema(values, span)
+    result['rsi'] = rsi(values, rsi_period, rsi_method)
+    _, result['bb_upper'], result['bb_lower'] = _bollinger(values, bb_window, bb_std, result[f'sma_{bb_window}'])
+    result['daily_return'], result['cumulative_return'] = returns(values)
+    return result
+
+
+def latest(indicators):
+    """Last value of each indicator series (one float, or one per ticker)."""
+    return {name: series[..., -1] if series.ndim > 1 else float(series[-1]) for name, series in indicators.items()}
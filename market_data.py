@@ -0,0 +1,162 @@
+import os
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from cache import TTLCache
+from concurrency import peer_executor
+from lazy import lazy_import
+from metrics import timed, upstream_call
+from ohlcv_store import ohlcv_store
+from shared_cache import shared_namespace
+from indicator_state import indicator_states
+from statements import StatementIndex, STATEMENTS_MIN_TTL
+
+yf = lazy_import('yfinance')
+
+# Seconds each kind of per-ticker data stays fresh. Quotes move all day;
+# statements are kept until the next filing is due (see SNAPSHOT_EXPIRY).
+SNAPSHOT_TTLS = {
+    'info': 300,
+    'history': 300,
+    'statements': STATEMENTS_MIN_TTL,
+}
+# Per worker; with the shared tier on, workers past this keep fewer tickers
+# in memory and read the rest from it instead of refetching.
+SNAPSHOT_MAXSIZE = int(os.getenv("SNAPSHOT_MAXSIZE", "512"))
+
+snapshot_caches = {
+    kind: TTLCache(maxsize=SNAPSHOT_MAXSIZE, ttl=ttl, name=f'snapshot_{kind}',
+                   shared=shared_namespace(f'snapshot_{kind}'))
+    for kind, ttl in SNAPSHOT_TTLS.items()
+}
+
+# Upstream fetch for each per-ticker snapshot kind (history goes through the OHLCV store)
+SNAPSHOT_LOADERS = {
+    'info': lambda ticker: yf.Ticker(ticker).info,
+    'statements': lambda ticker: _load_statements(yf.Ticker(ticker)),
+}
+
+# Kinds whose lifetime depends on what was loaded
+SNAPSHOT_EXPIRY = {
+    'statements': lambda index: index.seconds_until_next_filing(),
+}
+
+
+def _load_statements(stock):
+    return StatementIndex.from_frames(stock.financials, stock.balance_sheet, stock.cash_flow)
+
+
+def _fetch(kind, ticker):
+    with upstream_call('yfinance'):
+        return SNAPSHOT_LOADERS[kind](ticker)
+
+_info_futures = {}
+_info_futures_lock = threading.Lock()
+
+
+def _key(ticker):
+    return ticker.strip().upper()
+
+
+@timed('info')
+def get_info(ticker):
+    ticker = _key(ticker)
+    return snapshot_caches['info'].get_or_load(ticker, lambda: _fetch('info', ticker))
+
+
+def submit_info(ticker):
+    """Fetch info in the background, sharing one in-flight future per ticker."""
+    ticker = _key(ticker)
+    with _info_futures_lock:
+        future = _info_futures.get(ticker)
+        if future is not None:
+            return future
+        future = _info_futures[ticker] = Future()
+    # Submitted outside the lock: submit() blocks while the pool is full, and
+    # the tasks that would free a slot take the lock as they finish.
+    try:
+        task = peer_executor.submit(get_info, ticker)
+    except BaseException as e:
+        _settle_info_future(ticker, future, exception=e)
+        raise
+    task.add_done_callback(lambda task: _settle_info_future(ticker, future, task.exception(), task))
+    return future
+
+
+def _settle_info_future(ticker, future, exception=None, task=None):
+    with _info_futures_lock:
+        if _info_futures.get(ticker) is future:
+            del _info_futures[ticker]
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(task.result())
+
+
+@timed('history')
+def get_history(ticker, period="1y"):
+    ticker = _key(ticker)
+    return snapshot_caches['history'].get_or_load((ticker, period), lambda: ohlcv_store.history(ticker, period))
+
+
+@timed('close_matrix')
+def get_close_matrix(tickers, period="1y"):
+    """Closes for many tickers as a (tickers x days) array, right-aligned on each
+    ticker's latest bar; shorter histories are NaN-padded on the left."""
+    return get_price_matrices(tickers, ('Close',), period)['Close']
+
+
+def get_price_matrices(tickers, columns=('Close',), period="1y"):
+    """{column: (tickers x days) array} for OHLCV columns, aligned as in get_close_matrix."""
+    tickers = [_key(ticker) for ticker in tickers]
+    ohlcv_store.sync_many(tickers, period)
+    histories = [get_history(ticker, period) for ticker in tickers]
+    days = max((len(history) for history in histories), default=0)
+    matrices = {}
+    for column in columns:
+        matrix = matrices[column] = np.full((len(histories), days), np.nan)
+        for row, history in zip(matrix, histories):
+            if len(history):
+                row[-len(history):] = history[column].to_numpy()
+    return matrices
+
+
+@timed('indicators')
+def get_indicators(ticker):
+    return indicator_states.get(_key(ticker))
+
+
+@timed('statements')
+def get_statements(ticker):
+    """The ticker's StatementIndex, parsed once per filing."""
+    ticker = _key(ticker)
+    return snapshot_caches['statements'].get_or_load(
+        ticker, lambda: _fetch('statements', ticker), ttl=SNAPSHOT_EXPIRY['statements']
+    )
+
+
+def peek_snapshot(kind, ticker, period="1y"):
+    """Whatever snapshot of `kind` is cached for a ticker, stale or not, or None; never fetches."""
+    ticker = _key(ticker)
+    return snapshot_caches[kind].peek((ticker, period) if kind == 'history' else ticker)
+
+
+def snapshot_expires_in(kind, ticker):
+    """Seconds until a ticker's cached snapshot of `kind` goes stale, or None if not cached."""
+    ticker = _key(ticker)
+    if kind == 'history':
+        return ohlcv_store.expires_in(ticker)
+    return snapshot_caches[kind].ttl_remaining(ticker)
+
+
+def refresh_snapshot(kind, ticker):
+    """Refetch a snapshot ahead of its expiry so readers keep hitting warm data."""
+    ticker = _key(ticker)
+    if kind == 'history':
+        ohlcv_store.refresh(ticker)
+        snapshot_caches['history'].refresh((ticker, "1y"), lambda: ohlcv_store.history(ticker, "1y"))
+        indicator_states.get(ticker)
+    else:
+        snapshot_caches[kind].refresh(ticker, lambda: _fetch(kind, ticker), ttl=SNAPSHOT_EXPIRY.get(kind))
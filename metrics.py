@@ -0,0 +1,171 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from cache import named_caches
+from resilience import CircuitOpenError, circuit_breaker
+
+# Seconds; the tail is long because a full Claude analysis can take a minute
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Stage durations of the request being served. Executors copy the submitting
+# context, so stages run on pool threads land in the same request's list.
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    le = _format_labels(self.labelnames, labels, [('le', repr(float(bound)))])
+                    lines.append(f"{self.name}_bucket{le} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+registry = []
+
+request_seconds = Histogram('stockcopilot_request_seconds', "Time to serve a request, including any streamed body",
+                            ('endpoint', 'status'))
+stage_seconds = Histogram('stockcopilot_stage_seconds', "Time spent in each stage of serving a request", ('stage',))
+upstream_seconds = Histogram('stockcopilot_upstream_seconds', "Duration of calls to upstream services", ('upstream',))
+upstream_errors = Counter('stockcopilot_upstream_errors_total', "Upstream calls that raised", ('upstream',))
+upstream_rejections = Counter('stockcopilot_upstream_rejections_total',
+                              "Upstream calls failed fast because the circuit breaker was open", ('upstream',))
+
+
+def start_request():
+    _request_timings.set([])
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def upstream_call(name):
+    """Time a call to an upstream and feed its outcome to the upstream's
+    circuit breaker; raises CircuitOpenError without calling while it is open."""
+    breaker = circuit_breaker(name)
+    try:
+        breaker.allow()
+    except CircuitOpenError:
+        upstream_rejections.inc(name)
+        raise
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        upstream_errors.inc(name)
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    else:
+        breaker.record_success()
+    finally:
+        upstream_seconds.observe(time.perf_counter() - start, name)
+
+
+def server_timing():
+    """Server-Timing header value for the stages run so far in this request,
+    one entry per stage name with durations summed (stages overlap when they
+    run in parallel, so these do not add up to the total)."""
+    totals = {}
+    for name, elapsed in list(_request_timings.get() or ()):
+        totals[name] = totals.get(name, 0.0) + elapsed
+    return ', '.join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items())
+
+
+def render():
+    """Everything in the Prometheus text exposition format."""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    caches = sorted(named_caches.items())
+    for kind, help in (('hits', "Lookups that found a fresh entry"),
+                       ('misses', "Lookups that found nothing or an expired entry"),
+                       ('shared_hits', "Hits answered by the cross-worker tier rather than this process")):
+        name = f"stockcopilot_cache_{kind}_total"
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} counter")
+        for cache_name, cache in caches:
+            if hasattr(cache, kind):
+                lines.append(f'{name}{{cache="{cache_name}"}} {getattr(cache, kind)}')
+    return '\n'.join(lines) + '\n'
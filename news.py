@@ -0,0 +1,103 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache import TTLCache
+from concurrency import SingleFlight
+from metrics import upstream_call
+from resilience import CircuitOpenError
+from shared_cache import shared_namespace
+
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+NEWS_TIMEOUT = (float(os.getenv("NEWS_CONNECT_TIMEOUT", "3.05")), float(os.getenv("NEWS_READ_TIMEOUT", "10")))
+NEWS_RETRIES = int(os.getenv("NEWS_RETRIES", "2"))
+NEWS_POOL_SIZE = int(os.getenv("NEWS_POOL_SIZE", "16"))
+# The free tier has a small daily quota, so answers are reused for a while
+NEWS_CACHE_TTL = int(os.getenv("NEWS_CACHE_TTL", "900"))
+NEWS_ERROR_TTL = int(os.getenv("NEWS_ERROR_TTL", "60"))
+
+
+def _build_session():
+    retry = Retry(
+        total=NEWS_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=NEWS_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+session = _build_session()
+# Fresh answers are served without touching the network; older ones are kept
+# longer so we can revalidate them with a conditional request, or fall back
+# to them if NewsAPI is failing.
+fresh_articles = TTLCache(maxsize=512, ttl=NEWS_CACHE_TTL, name='news', shared=shared_namespace('news'))
+known_articles = TTLCache(maxsize=512, ttl=24 * 3600, name='news_revalidation',
+                          shared=shared_namespace('news_revalidation'))
+flights = SingleFlight()
+
+
+def fetch_articles(query):
+    articles = fresh_articles.get(query)
+    if articles is not None:
+        return articles
+    return flights.do(query, lambda: _fetch(query))
+
+
+def peek_articles(query):
+    """Articles we already hold for a query, however old, or None; never fetches."""
+    articles = fresh_articles.peek(query)
+    if articles is None:
+        previous = known_articles.peek(query)
+        articles = previous['articles'] if previous is not None else None
+    return articles
+
+
+def refresh_articles(query):
+    """Refetch a query ahead of its cache expiry."""
+    return flights.do(query, lambda: _fetch(query, force=True))
+
+
+def _fetch(query, force=False):
+    articles = None if force else fresh_articles.get(query)
+    if articles is not None:
+        return articles
+
+    previous = known_articles.get(query)
+    headers = {'X-Api-Key': NEWS_API_KEY or ''}
+    if previous is not None:
+        if previous['etag']:
+            headers['If-None-Match'] = previous['etag']
+        if previous['last_modified']:
+            headers['If-Modified-Since'] = previous['last_modified']
+
+    try:
+        with upstream_call('newsapi'):
+            response = session.get(NEWS_API_URL, params={'q': query}, headers=headers, timeout=NEWS_TIMEOUT)
+            if response.status_code == 304 and previous is not None:
+                articles = previous['articles']
+            else:
+                response.raise_for_status()
+                articles = response.json().get('articles', [])
+    except (requests.RequestException, ValueError, CircuitOpenError):
+        # Serve what we last had rather than failing the page, and back off briefly
+        articles = previous['articles'] if previous is not None else []
+        fresh_articles.set(query, articles, ttl=NEWS_ERROR_TTL)
+        return articles
+
+    fresh_articles.set(query, articles)
+    known_articles.set(query, {
+        'articles': articles,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    })
+    return articles
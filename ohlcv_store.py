@@ -0,0 +1,297 @@
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import numpy as np
+
+from cache import DATA_DIR
+from concurrency import file_lock, temp_path
+from lazy import lazy_import
+from metrics import upstream_call
+
+pd = lazy_import('pandas')
+yf = lazy_import('yfinance')
+
+OHLCV_DIR = os.getenv("OHLCV_DIR", os.path.join(DATA_DIR, "ohlcv"))
+# How long a ticker's stored bars count as current before we ask upstream for newer ones
+OHLCV_REFRESH_TTL = int(os.getenv("OHLCV_REFRESH_TTL", "300"))
+OHLCV_SEED_PERIOD = os.getenv("OHLCV_SEED_PERIOD", "2y")
+
+COLUMNS = ('Date', 'Open', 'High', 'Low', 'Close', 'Volume')
+DTYPES = {'Date': np.int64, 'Open': np.float64, 'High': np.float64, 'Low': np.float64,
+          'Close': np.float64, 'Volume': np.float64}
+
+# Calendar days covered by each yfinance period we can serve from the store
+PERIOD_DAYS = {'5d': 7, '1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731,
+               '5y': 1827, '10y': 3653, 'max': None}
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Tickers come from request input and name directories, so anything else
+# (including '.' and '..') is never looked up or stored
+SYMBOL_PATTERN = re.compile(r'(?=.*[A-Z0-9])[A-Z0-9^=.-]{1,15}')
+
+
+def is_valid_symbol(ticker):
+    return bool(SYMBOL_PATTERN.fullmatch(ticker))
+
+
+class OHLCVStore:
+    """Per-ticker daily bars kept as one append-only binary file per column.
+
+    Files only ever grow. A refresh overwrites the last stored bar in place
+    (it may have been an unfinished session) and appends anything newer;
+    meta.json records how many rows are valid, so readers never see a
+    partially written tail.
+
+    A ticker's files are only read or written under its thread lock and an
+    flock on its lock file (_locked()), so worker processes sharing the
+    store never see each other's writes half done.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, ticker):
+        with self._locks_lock:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _file_lock(self, ticker):
+        os.makedirs(self._path(ticker, ''), exist_ok=True)
+        return file_lock(self._path(ticker, '.lock'))
+
+    @contextmanager
+    def _locked(self, ticker):
+        with self._lock(ticker), self._file_lock(ticker):
+            yield
+
+    def _path(self, ticker, name):
+        if not is_valid_symbol(ticker):
+            raise ValueError(f"Invalid ticker symbol '{ticker}'")
+        return os.path.join(self.root, ticker, name)
+
+    def _read_meta(self, ticker):
+        try:
+            with open(self._path(ticker, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, ticker, meta):
+        path = self._path(ticker, 'meta.json')
+        tmp = temp_path(path)
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _columns(self, ticker, rows):
+        if rows == 0:
+            return {name: np.empty(0, dtype=DTYPES[name]) for name in COLUMNS}
+        return {
+            name: np.memmap(self._path(ticker, f'{name}.bin'), dtype=DTYPES[name], mode='r', shape=(rows,))
+            for name in COLUMNS
+        }
+
+    def _seed(self, ticker, period, history=None):
+        if history is None:
+            with upstream_call('yfinance'):
+                history = yf.Ticker(ticker).history(period=period)
+        frame = _to_columns(history)
+        os.makedirs(self._path(ticker, ''), exist_ok=True)
+        for name in COLUMNS:
+            path = self._path(ticker, f'{name}.bin')
+            tmp = temp_path(path)
+            frame[name].astype(DTYPES[name]).tofile(tmp)
+            os.replace(tmp, path)
+        previous = self._read_meta(ticker) or {}
+        meta = {
+            'rows': len(frame['Date']),
+            'seed_period': period,
+            'fetched_at': time.time(),
+            # Bumped whenever existing bars may have changed, e.g. after a split
+            'generation': previous.get('generation', 0) + 1,
+        }
+        self._write_meta(ticker, meta)
+        return meta
+
+    def _extend(self, ticker, meta, history=None):
+        rows = meta['rows']
+        stored = self._columns(ticker, rows)
+        dates = stored['Date']
+        # Refetch from the last settled bar so we can tell if upstream re-adjusted
+        # history (splits, dividends); if it did, the stored bars are stale.
+        anchor = max(rows - 2, 0)
+        if history is None:
+            with upstream_call('yfinance'):
+                history = yf.Ticker(ticker).history(start=_to_date(dates[anchor]).isoformat())
+        frame = _to_columns(history)
+        keep = frame['Date'] >= dates[anchor]
+        frame = {name: column[keep] for name, column in frame.items()}
+        if rows >= 2:
+            settled = np.flatnonzero(frame['Date'] == dates[anchor])
+            if settled.size and not np.isclose(frame['Close'][settled[0]], stored['Close'][anchor], rtol=1e-6):
+                return self._seed(ticker, meta['seed_period'])
+        if len(frame['Date']):
+            position = int(np.searchsorted(dates, frame['Date'][0]))
+            for name in COLUMNS:
+                with open(self._path(ticker, f'{name}.bin'), 'r+b') as f:
+                    f.seek(position * np.dtype(DTYPES[name]).itemsize)
+                    f.write(frame[name].astype(DTYPES[name]).tobytes())
+            rows = position + len(frame['Date'])
+        meta = dict(meta, rows=rows, fetched_at=time.time())
+        self._write_meta(ticker, meta)
+        return meta
+
+    def _plan(self, ticker, period):
+        """What _sync would do: ('seed', period), ('extend', meta) or (None, meta)."""
+        meta = self._read_meta(ticker)
+        expired = meta is not None and time.time() - meta['fetched_at'] > OHLCV_REFRESH_TTL
+        # A ticker upstream had no bars for (unknown, delisted) is stored with
+        # no rows and only asked for again once those no rows expire
+        if meta is None or (meta['rows'] == 0 and expired) or not _covers(meta['seed_period'], period):
+            return 'seed', period if _covers(period, OHLCV_SEED_PERIOD) else OHLCV_SEED_PERIOD
+        if expired and meta['rows']:
+            return 'extend', meta
+        return None, meta
+
+    def _sync(self, ticker, period):
+        action, arg = self._plan(ticker, period)
+        if action == 'seed':
+            return self._seed(ticker, arg)
+        if action == 'extend':
+            return self._extend(ticker, arg)
+        return arg
+
+    def sync_many(self, tickers, period="1y"):
+        """Bring many tickers up to date with one bulk download per kind of fetch."""
+        tickers = sorted(ticker for ticker in set(tickers) if is_valid_symbol(ticker))
+        locks = [self._lock(ticker) for ticker in tickers]
+        for lock in locks:
+            lock.acquire()
+        try:
+            # File locks are taken one ticker at a time, never across a
+            # download: another process may be syncing an overlapping set
+            seeds, extends = {}, {}
+            for ticker in tickers:
+                with self._file_lock(ticker):
+                    action, arg = self._plan(ticker, period)
+                    if action == 'seed':
+                        seeds.setdefault(arg, []).append(ticker)
+                    elif action == 'extend':
+                        extends[ticker] = self._columns(ticker, arg['rows'])['Date'][max(arg['rows'] - 2, 0)]
+
+            for seed_period, group in seeds.items():
+                frames = _download(group, period=seed_period)
+                for ticker in group:
+                    with self._file_lock(ticker):
+                        # Skipped if another process stored it while we downloaded
+                        if self._plan(ticker, period) == ('seed', seed_period):
+                            self._seed(ticker, seed_period, frames[ticker])
+
+            if extends:
+                frames = _download(list(extends), start=_to_date(min(extends.values())).isoformat())
+                for ticker in extends:
+                    with self._file_lock(ticker):
+                        action, meta = self._plan(ticker, period)
+                        if action == 'extend':
+                            self._extend(ticker, meta, frames[ticker])
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def expires_in(self, ticker):
+        """Seconds until the ticker's bars are due a refresh, or None if it was never stored."""
+        meta = self._read_meta(ticker)
+        if meta is None:
+            return None
+        return meta['fetched_at'] + OHLCV_REFRESH_TTL - time.time()
+
+    def refresh(self, ticker):
+        """Fetch any newer bars now, ahead of the usual refresh interval."""
+        if not is_valid_symbol(ticker):
+            return None
+        with self._locked(ticker):
+            meta = self._read_meta(ticker)
+            if meta is None or meta['rows'] == 0:
+                return self._seed(ticker, OHLCV_SEED_PERIOD)
+            return self._extend(ticker, meta)
+
+    def read(self, ticker, names=COLUMNS, after=None):
+        """Stored columns for bars dated after `after` (days since epoch), plus the store generation."""
+        if not is_valid_symbol(ticker):
+            return 0, {name: column for name, column in self._columns(ticker, 0).items() if name in names}
+        with self._locked(ticker):
+            meta = self._sync(ticker, OHLCV_SEED_PERIOD)
+            columns = self._columns(ticker, meta['rows'])
+            start = 0 if after is None else int(np.searchsorted(columns['Date'], after, side='right'))
+            return meta.get('generation', 0), {name: np.array(columns[name][start:]) for name in names}
+
+    def history(self, ticker, period="1y"):
+        if period not in PERIOD_DAYS:
+            with upstream_call('yfinance'):
+                return yf.Ticker(ticker).history(period=period)
+        if not is_valid_symbol(ticker):
+            # Treated like a symbol upstream has no bars for
+            window = self._columns(ticker, 0)
+        else:
+            with self._locked(ticker):
+                meta = self._sync(ticker, period)
+                columns = self._columns(ticker, meta['rows'])
+                start = 0
+                if PERIOD_DAYS[period] is not None and meta['rows']:
+                    start = int(np.searchsorted(columns['Date'], columns['Date'][-1] - PERIOD_DAYS[period], side='right'))
+                # Copy the requested window out of the maps before releasing the lock
+                window = {name: np.array(columns[name][start:]) for name in COLUMNS}
+        index = pd.DatetimeIndex(window.pop('Date').astype('datetime64[D]'), name='Date')
+        return pd.DataFrame(window, index=index)
+
+
+def _covers(stored_period, period):
+    if PERIOD_DAYS[stored_period] is None:
+        return True
+    if PERIOD_DAYS[period] is None:
+        return False
+    return PERIOD_DAYS[stored_period] >= PERIOD_DAYS[period]
+
+
+def _to_date(days):
+    return date.fromordinal(int(days) + _EPOCH_ORDINAL)
+
+
+def _download(tickers, **kwargs):
+    """One yf.download call split back into a history frame per ticker."""
+    with upstream_call('yfinance'):
+        data = yf.download(tickers, group_by='ticker', auto_adjust=True, actions=False,
+                           progress=False, threads=True, **kwargs)
+    frames = {}
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            frame = data[ticker] if ticker in data.columns.get_level_values(0) else pd.DataFrame()
+        else:
+            frame = data
+        # Bulk downloads share one date index, so a ticker's missing days come
+        # back as NaN; tickers with no bars at all get an empty frame
+        frames[ticker] = frame.dropna(subset=['Close']) if 'Close' in frame.columns else pd.DataFrame()
+    return frames
+
+
+def _to_columns(history):
+    if history.empty:
+        # yfinance's empty result for an unknown symbol has no DatetimeIndex
+        return {name: np.empty(0, dtype=DTYPES[name]) for name in COLUMNS}
+    index = history.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    columns = {'Date': index.normalize().values.astype('datetime64[D]').astype(np.int64)}
+    for name in COLUMNS[1:]:
+        columns[name] = history[name].to_numpy(dtype=np.float64)
+    return columns
+
+
+ohlcv_store = OHLCVStore(OHLCV_DIR)
@@ -0,0 +1,94 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from cache import TTLCache
+from shared_cache import shared_namespace
+
+COMPACT_ENCODING = 'compact-v1'
+# Below this size gzip costs more CPU than it saves on the wire
+GZIP_MIN_BYTES = 1024
+# How long a sent payload is kept so a returning client can be sent a delta against it
+DELTA_BASE_TTL = int(os.getenv("DELTA_BASE_TTL", "3600"))
+
+# Sent payloads by ETag, as (fields, days, closes), the bases that deltas are
+# computed against; shared so a client can be sent a delta by whichever worker
+# it lands on next (v2: bases used to be whole payload dicts)
+recent_payloads = TTLCache(maxsize=1024, ttl=DELTA_BASE_TTL, name='delta_bases',
+                           shared=shared_namespace('delta_bases_v2'))
+
+
+def series_days(index):
+    """A DatetimeIndex as int64 days since the epoch."""
+    return np.asarray(index.values.astype('datetime64[D]').astype(np.int64))
+
+
+def encode_series(index, values):
+    """Encode a daily series as a start date, base64 uint8/uint16 calendar-day
+    gaps between bars and base64 little-endian float32 values."""
+    days = series_days(index)
+    gaps = np.diff(days)
+    gap_type = 'uint8' if gaps.size == 0 or gaps.max() <= 0xFF else 'uint16'
+    return {
+        'encoding': COMPACT_ENCODING,
+        'start_date': str(np.datetime64(int(days[0]), 'D')) if days.size else None,
+        'count': int(days.size),
+        'gap_type': gap_type,
+        'date_gaps': base64.b64encode(gaps.astype('<u1' if gap_type == 'uint8' else '<u2').tobytes()).decode('ascii'),
+        'values': base64.b64encode(np.asarray(values, dtype='<f4').tobytes()).decode('ascii'),
+    }
+
+
+def gzip_response(response, accept_encoding):
+    """Gzip a buffered response in place if the client accepts it and it is worth it."""
+    if 'gzip' not in (accept_encoding or '').lower() or response.direct_passthrough:
+        return response
+    data = response.get_data()
+    if len(data) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Content-Length'] = str(len(response.get_data()))
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def payload_etag(fields, days, closes):
+    """ETag of a payload from its fields and the raw bytes of its price series,
+    so the series never has to be turned into JSON just to be hashed."""
+    digest = hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(np.ascontiguousarray(days, dtype='<i8').tobytes())
+    digest.update(np.ascontiguousarray(closes, dtype='<f8').tobytes())
+    return digest.hexdigest()[:32]
+
+
+def delta_payload(previous, current, since):
+    """For (fields, days, closes) payloads: the fields that differ from
+    `previous` and the position of the first bar dated on or after `since`,
+    or None if the client's older bars no longer match ours (for example
+    after a split was applied) and it needs the full payload."""
+    fields, days, closes = current
+    old_fields, old_days, old_closes = previous
+    try:
+        since_day = np.datetime64(since, 'D').astype(np.int64)
+    except ValueError:
+        return None
+    if not len(days) or not len(old_days) or since_day > old_days[-1]:
+        return None
+    # The window slides forward, so only the overlap before `since` has to agree
+    old_lo, old_hi = np.searchsorted(old_days, [days[0], since_day])
+    cut = int(np.searchsorted(days, since_day))
+    if not (np.array_equal(old_days[old_lo:old_hi], days[:cut])
+            and np.array_equal(old_closes[old_lo:old_hi], closes[:cut])):
+        return None
+    delta = {k: v for k, v in fields.items() if old_fields.get(k) != v}
+    delta.update({
+        'delta': True,
+        'since': since,
+        'start_date': str(np.datetime64(int(days[0]), 'D')),
+    })
+    return delta, cut
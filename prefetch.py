@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+
+import market_data
+import news
+from concurrency import io_executor
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "20"))
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "15"))
+# Refresh anything that will go stale within this many seconds
+PREFETCH_LEAD = float(os.getenv("PREFETCH_LEAD", "60"))
+# Upper bound on upstream calls the scheduler may make per minute
+PREFETCH_BUDGET = int(os.getenv("PREFETCH_BUDGET", "60"))
+POPULARITY_HALF_LIFE = float(os.getenv("POPULARITY_HALF_LIFE", "900"))
+
+logger = logging.getLogger(__name__)
+
+# (name, seconds until stale or None, refresh) for everything a dashboard view reads
+PREFETCH_JOBS = [
+    ('info', lambda t: market_data.snapshot_expires_in('info', t), lambda t: market_data.refresh_snapshot('info', t)),
+    ('history', lambda t: market_data.snapshot_expires_in('history', t), lambda t: market_data.refresh_snapshot('history', t)),
+    ('news', news.fresh_articles.ttl_remaining, news.refresh_articles),
+    ('statements', lambda t: market_data.snapshot_expires_in('statements', t),
+     lambda t: market_data.refresh_snapshot('statements', t)),
+]
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, n=1):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < n:
+                return False
+            self.tokens -= n
+            return True
+
+
+class PrefetchScheduler:
+    """Tracks which tickers users ask for and keeps the most popular ones warm."""
+
+    def __init__(self, jobs, top_n, interval, lead, budget, half_life):
+        self.jobs = jobs
+        self.top_n = top_n
+        self.interval = interval
+        self.lead = lead
+        self.budget = TokenBucket(budget)
+        self.half_life = half_life
+        self._scores = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, ticker):
+        """Count one request for a ticker; older requests count for exponentially less."""
+        ticker = ticker.strip().upper()
+        now = time.monotonic()
+        with self._lock:
+            score, seen = self._scores.get(ticker, (0.0, now))
+            self._scores[ticker] = (score * 0.5 ** ((now - seen) / self.half_life) + 1.0, now)
+
+    def top(self):
+        now = time.monotonic()
+        with self._lock:
+            decayed = {t: s * 0.5 ** ((now - seen) / self.half_life) for t, (s, seen) in self._scores.items()}
+            # Forget tickers nobody has asked about for a long while
+            for ticker, score in decayed.items():
+                if score < 0.01:
+                    del self._scores[ticker]
+        return sorted((t for t, s in decayed.items() if s >= 0.01), key=decayed.get, reverse=True)[:self.top_n]
+
+    def run_once(self):
+        for ticker in self.top():
+            for name, expires_in, refresh in self.jobs:
+                remaining = expires_in(ticker)
+                if remaining is not None and remaining > self.lead:
+                    continue
+                with self._lock:
+                    if (name, ticker) in self._running:
+                        continue
+                if not self.budget.take():
+                    return
+                with self._lock:
+                    self._running.add((name, ticker))
+                io_executor.submit(self._refresh, name, ticker, refresh)
+
+    def _refresh(self, name, ticker, refresh):
+        try:
+            refresh(ticker)
+        except Exception:
+            logger.warning("Prefetch of %s for %s failed", name, ticker, exc_info=True)
+        finally:
+            with self._lock:
+                self._running.discard((name, ticker))
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Prefetch pass failed")
+
+    def start(self):
+        # Started lazily from a request so it runs in the serving process,
+        # not in a pre-fork master that will never handle traffic.
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='prefetch', daemon=True)
+                self._thread.start()
+
+
+prefetcher = PrefetchScheduler(
+    PREFETCH_JOBS, PREFETCH_TOP_N, PREFETCH_INTERVAL, PREFETCH_LEAD, PREFETCH_BUDGET, POPULARITY_HALF_LIFE
+)
@@ -0,0 +1,139 @@
+import os
+
+# Rough token count without a tokenizer round trip; Claude averages about four
+# characters per token on English prose and numbers.
+CHARS_PER_TOKEN = 4
+# Below this, a trimmed section says too little to be worth its heading
+MIN_SECTION_TOKENS = 40
+
+# Which model, output cap and prompt budget each kind of request gets. Full
+# reports keep the large model; quick takes and Q&A go to a faster, cheaper one.
+MODEL_ROUTES = {
+    'report': {
+        'model': os.getenv("REPORT_MODEL", "claude-3-opus-20240229"),
+        'params': {'max_tokens': int(os.getenv("REPORT_MAX_TOKENS", "4000")), 'temperature': 0},
+        'prompt_budget': int(os.getenv("REPORT_PROMPT_BUDGET", "3000")),
+    },
+    'quick': {
+        'model': os.getenv("QUICK_MODEL", "claude-3-haiku-20240307"),
+        'params': {'max_tokens': int(os.getenv("QUICK_MAX_TOKENS", "1000")), 'temperature': 0},
+        'prompt_budget': int(os.getenv("QUICK_PROMPT_BUDGET", "1500")),
+    },
+    'qa': {
+        'model': os.getenv("QA_MODEL", "claude-3-haiku-20240307"),
+        'params': {'max_tokens': int(os.getenv("QA_MAX_TOKENS", "300")), 'temperature': 0},
+        'prompt_budget': int(os.getenv("QA_PROMPT_BUDGET", "1200")),
+    },
+}
+# Longer questions are cut here rather than crowding out the data
+QA_MAX_QUESTION_CHARS = 500
+
+REPORT_INSTRUCTIONS = """Based on this information, provide:
+1. A summary of the company's current position
+2. Key strengths and weaknesses
+3. Potential opportunities and threats
+4. A short-term outlook (next 3-6 months)
+5. A long-term outlook (1-3 years)
+6. Recommendations for investors (buy, hold, or sell, with reasoning)
+
+Please provide a balanced analysis, considering both bullish and bearish perspectives."""
+
+QUICK_INSTRUCTIONS = """Based on this information, give a brief take in under 250 words: the company's current
+position, the main risk, the short-term outlook and a buy, hold or sell view with one line of reasoning."""
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _compact(text):
+    # Our text blocks come from indented f-strings; the indentation is pure cost
+    return '\n'.join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+def _truncate(text, tokens):
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit - 1]
+    # Prefer ending on a whole line, then a whole word
+    boundary = max(cut.rfind('\n'), cut.rfind(' '))
+    return cut[:boundary if boundary > limit // 2 else len(cut)].rstrip() + '…'
+
+
+def build_prompt(intro, sections, instructions, budget):
+    """Join (title, body, priority) sections between an intro and instructions,
+    trimming the lowest-priority sections first so the whole stays within
+    `budget` estimated tokens. Sections keep their given order."""
+    sections = [(title, _compact(body), priority) for title, body, priority in sections]
+    remaining = budget - estimate_tokens(intro) - estimate_tokens(instructions)
+    bodies = {}
+    for i in sorted(range(len(sections)), key=lambda i: -sections[i][2]):
+        title, body, _ = sections[i]
+        room = remaining - estimate_tokens(title) - 2
+        if room < MIN_SECTION_TOKENS and estimate_tokens(body) > room:
+            continue
+        bodies[i] = _truncate(body, room)
+        remaining -= estimate_tokens(title) + estimate_tokens(bodies[i]) + 2
+
+    parts = [intro]
+    for number, i in enumerate(sorted(bodies), start=1):
+        parts.append(f"{number}. {sections[i][0]}:\n{bodies[i]}")
+    parts.append(instructions)
+    return '\n\n'.join(parts)
+
+
+def build_full_analysis_prompt(ticker, info, financial_analysis, technical_analysis, news, sentiment,
+                               competitor_analysis, budget, quick=False):
+    sentiment_text = (
+        f"Overall sentiment: {sentiment['overall']:.2f} (-1 to 1 scale)\n"
+        f"Positive: {sentiment['positive']}, Neutral: {sentiment['neutral']}, Negative: {sentiment['negative']}"
+    )
+    headlines = '\n'.join(f"- {item['title']}" for item in news[:3])
+    # Higher priority survives trimming longer; the business summary is long
+    # and changes least, so it gives way first.
+    sections = [
+        ('Company Overview', info.get('longBusinessSummary', 'No business summary available.'), 1),
+        ('Financial Analysis', financial_analysis, 5),
+        ('Technical Analysis', technical_analysis, 6),
+        ('News Sentiment', sentiment_text, 4),
+        ('Competitor Analysis', competitor_analysis, 2),
+        ('Recent News Headlines', headlines, 3),
+    ]
+    intro = f"Provide a comprehensive analysis for {info.get('longName', ticker)} (Ticker: {ticker}):"
+    return build_prompt(intro, sections, QUICK_INSTRUCTIONS if quick else REPORT_INSTRUCTIONS, budget)
+
+
+def _format_figure(value):
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
+
+
+def build_qa_prompt(ticker, question, info, technicals, headlines, budget):
+    name = info.get('longName', ticker)
+    figures = '\n'.join(
+        f"{label}: {_format_figure(info[key])}" for label, key in (
+            ('Price', 'currentPrice'), ('Day change', 'regularMarketChangePercent'), ('Market cap', 'marketCap'),
+            ('P/E', 'trailingPE'), ('Forward P/E', 'forwardPE'), ('EPS', 'trailingEps'),
+            ('Dividend yield', 'dividendYield'), ('Beta', 'beta'), ('Profit margin', 'profitMargins'),
+            ('Revenue', 'totalRevenue'), ('Debt to equity', 'debtToEquity'),
+            ('52-week high', 'fiftyTwoWeekHigh'), ('52-week low', 'fiftyTwoWeekLow'),
+            ('Sector', 'sector'), ('Industry', 'industry'),
+        ) if info.get(key) is not None
+    )
+    sections = [
+        ('Key Figures', figures or 'None available.', 4),
+        ('Technicals', technicals or 'None available.', 3),
+        ('Recent News Headlines', '\n'.join(f"- {title}" for title in headlines) or 'None available.', 2),
+        ('Company Overview', info.get('longBusinessSummary', ''), 1),
+    ]
+    intro = f"Data on {name} (Ticker: {ticker}) as shown on the user's dashboard:"
+    instructions = (
+        "Answer the user's question in a few sentences using only the data above. "
+        "If the data does not cover it, say so briefly.\n\n"
+        f"Question: {question[:QA_MAX_QUESTION_CHARS]}"
+    )
+    return build_prompt(intro, [s for s in sections if s[1]], instructions, budget)
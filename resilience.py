@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# Consecutive failures after which an upstream is failed fast, and how long
+# before a single trial call is let through to see if it has recovered
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "30"))
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Closed: calls go through. Open (after `threshold` consecutive failures):
+    calls raise CircuitOpenError at once. Half-open (`cooldown` seconds later):
+    one trial call goes through; it closes the circuit on success and reopens
+    it on failure."""
+
+    def __init__(self, name, threshold, cooldown):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return
+            wait_for = self.opened_at + self.cooldown - time.monotonic()
+            if self.state == 'open' and wait_for <= 0:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial:
+                self._trial = True
+                return
+        raise CircuitOpenError(f"{self.name} is unavailable; retrying in {max(wait_for, 0):.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            self._trial = False
+            self.failures = 0
+            self.state = 'closed'
+
+    def record_failure(self):
+        with self._lock:
+            self._trial = False
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that neither succeeded nor failed (e.g. a client hung up mid-stream)."""
+        with self._lock:
+            self._trial = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(name):
+    """The breaker for one upstream, created on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN)
+        return breaker
+
+
+class Deadline:
+    """A request's time budget. Stages are given a share of it, counted from
+    the start of the request, by which they must be done."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.start = time.monotonic()
+
+    def at(self, share=1.0):
+        return self.start + self.seconds * share
+
+    def remaining(self, share=1.0):
+        return max(self.at(share) - time.monotonic(), 0.0)
+
+
+def gather(futures, deadline, shares):
+    """Yield (stage, future) for {future: stage} as each finishes, or
+    (stage, None) once a stage's share of `deadline` has passed without it.
+    Abandoned futures keep running; whatever they load still gets cached."""
+    pending = dict(futures)
+    while pending:
+        now = time.monotonic()
+        for future, name in list(pending.items()):
+            if future.done():
+                del pending[future]
+                yield name, future
+            elif deadline.at(shares[name]) <= now:
+                del pending[future]
+                yield name, None
+        if pending:
+            due = min(deadline.at(shares[name]) for name in pending.values())
+            wait(pending, timeout=max(due - time.monotonic(), 0.0), return_when=FIRST_COMPLETED)
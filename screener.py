@@ -0,0 +1,223 @@
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from cache import DATA_DIR, TTLCache
+from indicators import compute_indicators, latest, sma, trailing_returns
+from market_data import get_price_matrices, peek_snapshot, submit_info
+from metrics import timed
+from shared_cache import shared_namespace
+
+# A universe is a text file of tickers, one per line ('#' starts a comment),
+# named <universe>.txt. Files here override the ones shipped in universes/.
+SCREENER_UNIVERSE_DIR = os.getenv("SCREENER_UNIVERSE_DIR", os.path.join(DATA_DIR, "universes"))
+BUNDLED_UNIVERSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "universes")
+SCREENER_DEFAULT_UNIVERSE = os.getenv("SCREENER_DEFAULT_UNIVERSE", "dow30")
+# Universes loaded as soon as the refresh thread starts, rather than on first use
+SCREENER_PRELOAD = [name for name in os.getenv("SCREENER_PRELOAD", SCREENER_DEFAULT_UNIVERSE).split(',') if name]
+SCREENER_REFRESH_ENABLED = os.getenv("SCREENER_REFRESH_ENABLED", "1") == "1"
+SCREENER_REFRESH_INTERVAL = float(os.getenv("SCREENER_REFRESH_INTERVAL", "900"))
+# Info lookups started per pass for tickers we hold no fundamentals for, so a
+# large universe fills in over a few passes instead of in one burst upstream
+SCREENER_INFO_BATCH = int(os.getenv("SCREENER_INFO_BATCH", "50"))
+SCREENER_MAX_RESULTS = 200
+# Two years of bars, so the 200-day SMA and one-year return are defined from day one
+HISTORY_PERIOD = "2y"
+VOLUME_AVERAGE_DAYS = 20
+
+# Screenable columns taken from info
+FUNDAMENTALS = {
+    'pe': 'trailingPE',
+    'forward_pe': 'forwardPE',
+    'market_cap': 'marketCap',
+    'dividend_yield': 'dividendYield',
+    'beta': 'beta',
+}
+# Everything a filter (<column>_min / <column>_max) or sort can name
+SCREEN_COLUMNS = (
+    'price', 'change', 'volume', 'volume_ratio', 'rsi', 'sma_50', 'sma_200', 'pct_from_sma_50', 'pct_from_sma_200',
+    'return_1m', 'return_3m', 'return_1y',
+) + tuple(FUNDAMENTALS)
+
+logger = logging.getLogger(__name__)
+
+
+def _universe_path(name):
+    if not name.replace('_', '').replace('-', '').isalnum():
+        return None
+    for directory in (SCREENER_UNIVERSE_DIR, BUNDLED_UNIVERSE_DIR):
+        path = os.path.join(directory, f"{name}.txt")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def available_universes():
+    names = set()
+    for directory in (SCREENER_UNIVERSE_DIR, BUNDLED_UNIVERSE_DIR):
+        if os.path.isdir(directory):
+            names.update(entry[:-4] for entry in os.listdir(directory) if entry.endswith('.txt'))
+    return sorted(names)
+
+
+def load_tickers(name):
+    path = _universe_path(name)
+    if path is None:
+        raise KeyError(name)
+    with open(path) as f:
+        symbols = (line.split('#')[0].strip().upper() for line in f)
+        return list(dict.fromkeys(symbol for symbol in symbols if symbol))
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else math.nan
+
+
+def build_universe(name):
+    """Screenable columns for every ticker in a universe, worked out in one
+    vectorized pass over its (tickers x days) close and volume matrices plus
+    the fundamentals we hold in the info snapshots."""
+    tickers = load_tickers(name)
+    prices = get_price_matrices(tickers, ('Close', 'Volume'), period=HISTORY_PERIOD)
+    closes, volumes = prices['Close'], prices['Volume']
+    values = latest(compute_indicators(closes, sma_windows=(50, 200), ema_spans=(), rsi_method='wilder'))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = closes[:, -1] if closes.size else np.full(len(tickers), np.nan)
+        returns = trailing_returns(closes, [1, 21, 63, 252]) * 100
+        columns = {
+            'price': price,
+            'change': returns[:, 0],
+            'volume': volumes[:, -1] if volumes.size else np.full(len(tickers), np.nan),
+            # Today's volume against the average of the sessions before it
+            'volume_ratio': volumes[:, -1] / sma(volumes[:, :-1], VOLUME_AVERAGE_DAYS)[:, -1]
+            if volumes.shape[1] > VOLUME_AVERAGE_DAYS else np.full(len(tickers), np.nan),
+            'rsi': values['rsi'],
+            'sma_50': values['sma_50'],
+            'sma_200': values['sma_200'],
+            'pct_from_sma_50': (price / values['sma_50'] - 1) * 100,
+            'pct_from_sma_200': (price / values['sma_200'] - 1) * 100,
+            'return_1m': returns[:, 1],
+            'return_3m': returns[:, 2],
+            'return_1y': returns[:, 3],
+        }
+
+    # Fundamentals come from whatever info is cached (stale is fine for
+    # these); missing ones are fetched in the background for the next pass
+    infos = [peek_snapshot('info', ticker) for ticker in tickers]
+    for ticker in [t for t, info in zip(tickers, infos) if info is None][:SCREENER_INFO_BATCH]:
+        submit_info(ticker)
+    infos = [info or {} for info in infos]
+    for column, key in FUNDAMENTALS.items():
+        columns[column] = np.array([_number(info.get(key)) for info in infos])
+
+    return {
+        'name': name,
+        'tickers': tickers,
+        'names': [info.get('longName', ticker) for ticker, info in zip(tickers, infos)],
+        'sectors': np.array([info.get('sector') or '' for info in infos], dtype=object),
+        'columns': columns,
+        'fundamentals_coverage': sum(bool(info) for info in infos) / len(tickers) if tickers else 0.0,
+        'built_at': time.time(),
+    }
+
+
+def parse_filters(form):
+    """[(column, 'min' or 'max', bound)] from <column>_min / <column>_max fields."""
+    filters = []
+    for field, value in form.items():
+        column, _, side = field.rpartition('_')
+        if side not in ('min', 'max') or value == '':
+            continue
+        if column not in SCREEN_COLUMNS:
+            raise ValueError(f"Unknown screen column '{column}'")
+        try:
+            filters.append((column, side, float(value)))
+        except ValueError:
+            raise ValueError(f"'{field}' must be a number")
+    return filters
+
+
+def _finite_or_none(value):
+    return float(value) if np.isfinite(value) else None
+
+
+@timed('screen')
+def screen(universe, filters, sector=None, sort='-market_cap', limit=50):
+    """Tickers passing every filter, ranked by `sort` (a column, '-' for
+    descending); tickers missing the sort column rank last."""
+    descending = sort.startswith('-')
+    sort_column = sort.lstrip('-')
+    if sort_column not in SCREEN_COLUMNS:
+        raise ValueError(f"Unknown sort column '{sort_column}'")
+    columns = universe['columns']
+    # NaN compares false, so a ticker lacking a filtered figure never passes
+    mask = np.isfinite(columns['price'])
+    for column, side, bound in filters:
+        mask &= columns[column] >= bound if side == 'min' else columns[column] <= bound
+    if sector:
+        mask &= universe['sectors'] == sector
+    rows = np.flatnonzero(mask)
+    keys = columns[sort_column][rows]
+    rows = rows[np.argsort(-keys if descending else keys, kind='stable')][:limit]
+    return int(mask.sum()), [
+        dict({'ticker': universe['tickers'][i], 'name': universe['names'][i], 'sector': universe['sectors'][i] or None},
+             **{column: _finite_or_none(columns[column][i]) for column in SCREEN_COLUMNS})
+        for i in rows
+    ]
+
+
+class Screener:
+    """Built universes, held in memory (and the shared tier) and rebuilt on a
+    schedule: the preloaded ones always, others while they are being asked for."""
+
+    def __init__(self, interval, preload):
+        self.interval = interval
+        self._cache = TTLCache(maxsize=16, ttl=2 * interval, name='screener', shared=shared_namespace('screener'))
+        self.preload = set(preload)
+        self._active = set()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """A built universe, building it now if it is not loaded; KeyError if there is no such universe."""
+        if _universe_path(name) is None:
+            raise KeyError(name)
+        with self._lock:
+            self._active.add(name)
+        return self._cache.get_or_load(name, lambda: build_universe(name))
+
+    def run_once(self):
+        with self._lock:
+            names, self._active = self._active | self.preload, set()
+        for name in sorted(names):
+            # Another worker may have rebuilt it already
+            remaining = self._cache.ttl_remaining(name)
+            if remaining is None or remaining <= self.interval:
+                try:
+                    self._cache.refresh(name, lambda: build_universe(name))
+                except Exception:
+                    logger.warning("Building universe %s failed", name, exc_info=True)
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.warning("Screener pass failed", exc_info=True)
+            time.sleep(self.interval / 2)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='screener', daemon=True)
+                self._thread.start()
+
+
+screener = Screener(SCREENER_REFRESH_INTERVAL, SCREENER_PRELOAD)
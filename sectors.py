@@ -0,0 +1,118 @@
+import logging
+import math
+import os
+import threading
+import time
+
+from cache import TTLCache
+from indicators import trailing_returns
+from market_data import get_close_matrix
+from metrics import timed
+from shared_cache import shared_namespace
+
+SECTOR_REFRESH_ENABLED = os.getenv("SECTOR_REFRESH_ENABLED", "1") == "1"
+# How often the returns are worked out again; the OHLCV store decides when
+# bars are actually refetched (OHLCV_REFRESH_TTL)
+SECTOR_REFRESH_INTERVAL = float(os.getenv("SECTOR_REFRESH_INTERVAL", "300"))
+
+INDICES = {
+    'S&P 500': '^GSPC',
+    'NASDAQ': '^IXIC',
+    'DOW': '^DJI',
+    'FTSE': '^FTSE',
+    'DAX': '^GDAXI',
+    'NIKKEI': '^N225',
+}
+# SPDR sector ETFs, keyed by the sector names yfinance gives in info['sector']
+SECTOR_ETFS = {
+    'Technology': 'XLK',
+    'Financial Services': 'XLF',
+    'Healthcare': 'XLV',
+    'Energy': 'XLE',
+    'Industrials': 'XLI',
+    'Consumer Cyclical': 'XLY',
+    'Consumer Defensive': 'XLP',
+    'Utilities': 'XLU',
+    'Basic Materials': 'XLB',
+    'Real Estate': 'XLRE',
+    'Communication Services': 'XLC',
+}
+# Lookbacks in trading days
+HORIZONS = {'1d': 1, '1w': 5, '1m': 21, '3m': 63, '6m': 126, '1y': 252}
+# Two years of bars so the one-year return has a full lookback
+HISTORY_PERIOD = "2y"
+
+_KEY = 'all'
+
+logger = logging.getLogger(__name__)
+
+
+def compute_performance():
+    """Percent returns over every horizon for all indices and sector ETFs, in
+    one pass over their (symbols x days) close matrix."""
+    groups = [('indices', INDICES), ('sectors', SECTOR_ETFS)]
+    rows = [(group, label, symbol) for group, members in groups for label, symbol in members.items()]
+    closes = get_close_matrix([symbol for _, _, symbol in rows], period=HISTORY_PERIOD)
+    table = trailing_returns(closes, list(HORIZONS.values())) * 100
+    performance = {'horizons': list(HORIZONS), 'indices': {}, 'sectors': {}}
+    for (group, label, symbol), values in zip(rows, table.tolist()):
+        performance[group][label] = {
+            'symbol': symbol,
+            'returns': {h: None if math.isnan(v) else round(v, 2) for h, v in zip(HORIZONS, values)},
+        }
+    return performance
+
+
+class SectorPerformance:
+    """Index and sector returns worked out on a schedule and served to every
+    request from memory. The result also goes to the shared tier, so one
+    worker's pass serves the rest."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        # Kept for two intervals so readers never wait on a scheduled pass
+        self._cache = TTLCache(maxsize=1, ttl=2 * interval, name='sector_performance',
+                               shared=shared_namespace('sector_performance'))
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The latest figures, computing them now only if none exist yet; the
+        last known (or empty) figures if that fails."""
+        try:
+            return self._cache.get_or_load(_KEY, compute_performance)
+        except Exception:
+            logger.warning("Sector performance could not be computed", exc_info=True)
+            return self._cache.peek(_KEY, {})
+
+    def run_once(self):
+        # Another worker may have done this pass already
+        remaining = self._cache.ttl_remaining(_KEY)
+        if remaining is None or remaining <= self.interval:
+            self._cache.refresh(_KEY, compute_performance)
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.warning("Sector performance pass failed", exc_info=True)
+            time.sleep(self.interval / 4)
+
+    def start(self):
+        # Started from a request, like the prefetcher, so it runs in the serving process
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='sector-performance', daemon=True)
+                self._thread.start()
+
+
+sector_performance = SectorPerformance(SECTOR_REFRESH_INTERVAL)
+
+
+@timed('sectors')
+def get_sector_performance(sector=None):
+    """Returns for every index and sector ETF, with the stock's own sector named if we track it."""
+    return dict(sector_performance.get(), sector=sector if sector in SECTOR_ETFS else None)
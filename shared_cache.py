@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from cache import DATA_DIR
+
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "1") == "1"
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join(DATA_DIR, "shared_cache.sqlite3"))
+SHARED_CACHE_MAX_BYTES = int(os.getenv("SHARED_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Reads refresh an entry's LRU position at most this often, so hot keys do
+# not turn every read into a write
+TOUCH_INTERVAL = 60
+# Total size is checked against the cap every this many writes per process
+EVICT_CHECK_INTERVAL = 64
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """Pickled entries in one SQLite database in WAL mode, shared by every
+    worker process on the host. All namespaces live in one table under one
+    size cap: once over it, expired entries go first, then the least
+    recently read. Expired entries are otherwise kept so callers that can use
+    stale data (peek) still find them.
+
+    Errors talking to SQLite are logged and treated as misses; the shared
+    tier must never fail a request."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # One connection per thread, reopened after fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, namespace, key, stale=False):
+        """(value, expires_at wall-clock time) or None; expired entries only if `stale`."""
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or (not stale and row[1] <= now):
+                return None
+            if row[2] < now - TOUCH_INTERVAL:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                             (now, namespace, key))
+            return pickle.loads(row[0]), row[1]
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            logger.warning("Shared cache read of %s/%s failed", namespace, key, exc_info=True)
+            return None
+
+    def expires_at(self, namespace, key):
+        try:
+            row = self._connection().execute(
+                "SELECT expires_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        except sqlite3.Error:
+            logger.warning("Shared cache lookup of %s/%s failed", namespace, key, exc_info=True)
+            return None
+        return None if row is None else row[0]
+
+    def set(self, namespace, key, value, ttl):
+        now = time.time()
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, data, len(data), now + ttl, now)
+            )
+            self._writes += 1
+            if self._writes % EVICT_CHECK_INTERVAL == 1:
+                self._evict(conn, now)
+        except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError):
+            logger.warning("Shared cache write of %s/%s failed", namespace, key, exc_info=True)
+
+    def _evict(self, conn, now):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        # Then least recently read, down to 90% so we are not back here on the next write
+        target = self.max_bytes * 0.9
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while total > target:
+            deleted = conn.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY accessed_at LIMIT 100)"
+            ).rowcount
+            if not deleted:
+                break
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def delete(self, namespace, key):
+        try:
+            self._connection().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error:
+            logger.warning("Shared cache delete of %s/%s failed", namespace, key, exc_info=True)
+
+    def clear(self, namespace):
+        try:
+            self._connection().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+        except sqlite3.Error:
+            logger.warning("Shared cache clear of %s failed", namespace, exc_info=True)
+
+    def namespace(self, name):
+        return SharedNamespace(self, name)
+
+
+class SharedNamespace:
+    """One cache's slice of the shared tier, keyed like the in-process cache it backs."""
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+
+    @staticmethod
+    def _key(key):
+        return json.dumps(key)
+
+    def get(self, key, stale=False):
+        """(value, seconds until expiry) or None."""
+        entry = self.store.get(self.name, self._key(key), stale)
+        return None if entry is None else (entry[0], entry[1] - time.time())
+
+    def ttl_remaining(self, key):
+        expires_at = self.store.expires_at(self.name, self._key(key))
+        return None if expires_at is None else expires_at - time.time()
+
+    def set(self, key, value, ttl):
+        self.store.set(self.name, self._key(key), value, ttl)
+
+    def delete(self, key):
+        self.store.delete(self.name, self._key(key))
+
+    def clear(self):
+        self.store.clear(self.name)
+
+
+shared_cache = SharedCache(SHARED_CACHE_PATH, SHARED_CACHE_MAX_BYTES)
+
+
+def shared_namespace(name):
+    """The shared tier for one cache, or None when it is turned off."""
+    return shared_cache.namespace(name) if SHARED_CACHE_ENABLED else None
@@ -0,0 +1,123 @@
+import math
+import os
+from datetime import date, datetime, timedelta, timezone
+
+# Statements only change when a company files, so they are cached until the
+# filing after the latest period we hold should be out. Past that date (a
+# late filer, or one yfinance has not picked up yet) we check back every
+# STATEMENTS_MIN_TTL seconds.
+FILING_LAG_DAYS = int(os.getenv("FILING_LAG_DAYS", "60"))
+STATEMENTS_MIN_TTL = int(os.getenv("STATEMENTS_MIN_TTL", str(6 * 3600)))
+STATEMENTS_MAX_TTL = int(os.getenv("STATEMENTS_MAX_TTL", str(120 * 86400)))
+
+# yfinance has renamed line items between versions. Only true renames belong
+# here (not related items such as Operating Revenue): each is stored under the
+# first name listed, and when a statement has several, the one listed first wins.
+LINE_ITEM_ALIASES = {
+    'Total Revenue': ('Total Revenue',),
+    'Net Income': ('Net Income',),
+    'Current Assets': ('Current Assets', 'Total Current Assets'),
+    'Current Liabilities': ('Current Liabilities', 'Total Current Liabilities'),
+    'Inventory': ('Inventory',),
+    'Operating Cash Flow': ('Operating Cash Flow', 'Total Cash From Operating Activities'),
+    'Capital Expenditure': ('Capital Expenditure', 'Capital Expenditures'),
+    'Free Cash Flow': ('Free Cash Flow',),
+}
+
+
+def _normalize(name):
+    return ' '.join(str(name).split()).lower()
+
+
+_CANONICAL = {_normalize(alias): _normalize(item) for item, aliases in LINE_ITEM_ALIASES.items() for alias in aliases}
+# Position of each alias in its list; lower wins
+_PRIORITY = {_normalize(alias): rank for aliases in LINE_ITEM_ALIASES.values() for rank, alias in enumerate(aliases)}
+
+
+def _period(column):
+    return column.date() if hasattr(column, 'date') else date.fromisoformat(str(column)[:10])
+
+
+class StatementIndex:
+    """A company's income statement, balance sheet and cash flow statement as
+    one {(line item, fiscal period end): value} index, with the ratios the
+    dashboard shows worked out once per period when the index is built."""
+
+    def __init__(self, values):
+        self.values = values
+        self.periods = sorted({period for _, period in values}, reverse=True)
+        self.ratios = {period: self._ratios(period) for period in self.periods}
+
+    @classmethod
+    def from_frames(cls, *frames):
+        """Build from yfinance statement frames (line items by period-end columns)."""
+        values, ranks = {}, {}
+        for frame in frames:
+            if frame is None or frame.empty:
+                continue
+            for column in frame.columns:
+                period = _period(column)
+                for name, value in frame[column].items():
+                    if value is None or (isinstance(value, float) and math.isnan(value)):
+                        continue
+                    item = _normalize(name)
+                    key = (_CANONICAL.get(item, item), period)
+                    rank = _PRIORITY.get(item, 0)
+                    if key not in values or rank < ranks[key]:
+                        values[key], ranks[key] = float(value), rank
+        return cls(values)
+
+    def get(self, item, period=None):
+        """A line item for one period, or for the newest period that reports it."""
+        item = _CANONICAL.get(_normalize(item), _normalize(item))
+        if period is not None:
+            return self.values.get((item, period))
+        for period in self.periods:
+            value = self.values.get((item, period))
+            if value is not None:
+                return value
+        return None
+
+    def ratio(self, name, period=None):
+        """A derived ratio for one period, or the newest period it can be worked out for."""
+        if period is not None:
+            return self.ratios.get(period, {}).get(name)
+        for period in self.periods:
+            value = self.ratios[period].get(name)
+            if value is not None:
+                return value
+        return None
+
+    def _ratios(self, period):
+        current_assets = self.get('Current Assets', period)
+        current_liabilities = self.get('Current Liabilities', period)
+        # Companies that hold no stock (banks, software) report no inventory line
+        inventory = self.get('Inventory', period) or 0.0
+        free_cash_flow = self.get('Free Cash Flow', period)
+        operating_cash_flow = self.get('Operating Cash Flow', period)
+        capital_expenditure = self.get('Capital Expenditure', period)
+        if free_cash_flow is None and operating_cash_flow is not None and capital_expenditure is not None:
+            # yfinance reports capital expenditure as a negative cash flow
+            free_cash_flow = operating_cash_flow + capital_expenditure
+        ratios = {'free_cash_flow': free_cash_flow}
+        if current_assets is not None and current_liabilities:
+            ratios['current_ratio'] = current_assets / current_liabilities
+            ratios['quick_ratio'] = (current_assets - inventory) / current_liabilities
+        return ratios
+
+    def next_filing(self):
+        """When the statements for the period after the newest one should be
+        published, from the spacing of the periods we have (annual or quarterly)."""
+        if not self.periods:
+            return None
+        gaps = sorted((a - b).days for a, b in zip(self.periods, self.periods[1:]))
+        cadence = gaps[len(gaps) // 2] if gaps else 365
+        return self.periods[0] + timedelta(days=cadence + FILING_LAG_DAYS)
+
+    def seconds_until_next_filing(self, now=None):
+        due = self.next_filing()
+        if due is None:
+            return STATEMENTS_MIN_TTL
+        now = now or datetime.now(timezone.utc)
+        remaining = (datetime(due.year, due.month, due.day, tzinfo=timezone.utc) - now).total_seconds()
+        return min(max(remaining, STATEMENTS_MIN_TTL), STATEMENTS_MAX_TTL)
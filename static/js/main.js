@@ -4,6 +4,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const tickerInput = document.getElementById('ticker-input');
     const aiForm = document.getElementById('ai-form');
     const fullAnalysisBtn = document.getElementById('full-analysis-btn');
+    const watchlistForm = document.getElementById('watchlist-form');
 
     if (searchBtn) {
         console.log("Search button found");
@@ -29,6 +30,17 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    if (watchlistForm) {
+        watchlistForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const tickers = watchlistForm.querySelector('input[name="tickers"]').value;
+            if (tickers) {
+                console.log("Loading watchlist:", tickers);
+                getWatchlist(tickers);
+            }
+        });
+    }
+
     if (fullAnalysisBtn) {
         fullAnalysisBtn.addEventListener('click', function() {
             console.log("Full analysis button clicked");
@@ -41,42 +53,197 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// Last payload and its ETag per ticker, so repeat searches only fetch new bars
+const stockDataCache = {};
+
 function getStockData(ticker) {
     console.log("Getting stock data for:", ticker);
+    const cached = stockDataCache[ticker];
+    const headers = {
+        'Content-Type': 'application/x-www-form-urlencoded',
+    };
+    let body = `ticker=${ticker}&format=compact`;
+    if (cached && cached.etag && cached.data.historical_dates.length) {
+        headers['If-None-Match'] = cached.etag;
+        body += `&since=${cached.data.historical_dates[cached.data.historical_dates.length - 1]}`;
+    }
     fetch('/get_stock_data', {
+        method: 'POST',
+        headers: headers,
+        body: body
+    })
+    .then(response => {
+        if (response.status === 304) {
+            return { data: cached.data, etag: cached.etag, notModified: true };
+        }
+        return response.json().then(data => ({ data: data, etag: response.headers.get('ETag') }));
+    })
+    .then(result => {
+        let data = result.data;
+        console.log("Received stock data:", result.notModified ? "not modified" : data);
+        if (data.historical) {
+            const series = decodeSeries(data.historical);
+            delete data.historical;
+            data.historical_dates = series.dates;
+            data.historical_data = series.values;
+        }
+        if (data.delta) {
+            data = mergeStockData(cached.data, data);
+        }
+        if (!data.error) {
+            stockDataCache[ticker] = { data: data, etag: result.etag };
+        }
+        updateDashboard(data);
+    })
+    .catch(error => console.error('Error:', error));
+}
+
+function mergeStockData(base, delta) {
+    // Keep our bars from the server's window start up to `since`, then append
+    // the bars it sent (the one dated `since` may have been revised)
+    const merged = Object.assign({}, base);
+    const dates = [];
+    const values = [];
+    base.historical_dates.forEach((date, i) => {
+        if (date >= delta.start_date && date < delta.since) {
+            dates.push(date);
+            values.push(base.historical_data[i]);
+        }
+    });
+    Object.keys(delta).forEach(key => {
+        if (!['delta', 'since', 'start_date', 'historical_dates', 'historical_data'].includes(key)) {
+            merged[key] = delta[key];
+        }
+    });
+    merged.historical_dates = dates.concat(delta.historical_dates);
+    merged.historical_data = values.concat(delta.historical_data);
+    return merged;
+}
+
+function base64ToBytes(text) {
+    return Uint8Array.from(atob(text), c => c.charCodeAt(0));
+}
+
+function decodeSeries(series) {
+    // Inverse of payload.encode_series: a start date, day gaps between bars and float32 values
+    const values = Array.from(new Float32Array(base64ToBytes(series.values).buffer));
+    const gapBytes = base64ToBytes(series.date_gaps);
+    const gaps = series.gap_type === 'uint16' ? new Uint16Array(gapBytes.buffer) : gapBytes;
+    const dates = [];
+    if (series.count > 0) {
+        const day = new Date(`${series.start_date}T00:00:00Z`);
+        dates.push(series.start_date);
+        gaps.forEach(gap => {
+            day.setUTCDate(day.getUTCDate() + gap);
+            dates.push(day.toISOString().slice(0, 10));
+        });
+    }
+    return {dates, values};
+}
+
+function getWatchlist(tickers) {
+    fetch('/get_watchlist', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/x-www-form-urlencoded',
         },
-        body: `ticker=${ticker}`
+        body: `tickers=${encodeURIComponent(tickers)}`
     })
     .then(response => response.json())
     .then(data => {
-        console.log("Received stock data:", data);
-        updateDashboard(data);
+        console.log("Received watchlist:", data);
+        if (data.error) {
+            console.error('Watchlist error:', data.error);
+            return;
+        }
+        updateWatchlist(data.tickers);
     })
     .catch(error => console.error('Error:', error));
 }
 
 function getAIAnalysis(ticker, question) {
     console.log("Getting AI analysis for:", ticker, "Question:", question);
+    updateAIAnalysis('');
     fetch('/get_ai_analysis', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/x-www-form-urlencoded',
         },
-        body: `ticker=${ticker}&question=${question}`
+        body: `ticker=${encodeURIComponent(ticker)}&question=${encodeURIComponent(question)}`
     })
-    .then(response => response.json())
-    .then(data => {
-        console.log("Received AI analysis:", data);
-        updateAIAnalysis(data.analysis);
+    .then(response => {
+        if (!response.ok) {
+            return response.json().then(data => updateAIAnalysis(data.error || 'Unable to answer right now.'));
+        }
+        // The answer streams in as plain text; show it as it arrives
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let answer = '';
+        const read = () => reader.read().then(({done, value}) => {
+            if (done) {
+                console.log("Received AI analysis:", answer);
+                return;
+            }
+            answer += decoder.decode(value, {stream: true});
+            updateAIAnalysis(answer);
+            return read();
+        });
+        return read();
     })
     .catch(error => console.error('Error:', error));
 }
 
 function getFullAnalysis(ticker) {
     console.log("Getting full analysis for:", ticker);
+    if (!window.EventSource) {
+        getFullAnalysisJSON(ticker);
+        return;
+    }
+
+    const fullAnalysisContent = document.querySelector('.full-analysis-content');
+    fullAnalysisContent.innerHTML = `
+        <h3>AI-Generated Analysis</h3>
+        <div id="full-analysis-ai">Waiting for data…</div>
+        <h3>Financial Analysis</h3>
+        <div id="full-analysis-financials">Loading…</div>
+        <h3>Technical Analysis</h3>
+        <div id="full-analysis-technicals">Loading…</div>
+        <h3>Recent News</h3>
+        <ul id="full-analysis-news"><li>Loading…</li></ul>
+    `;
+
+    let analysisText = '';
+    const source = new EventSource(`/get_full_analysis_stream?ticker=${encodeURIComponent(ticker)}`);
+    const setText = (id, text) => {
+        document.getElementById(id).innerHTML = text.replace(/\n/g, '<br>');
+    };
+
+    source.addEventListener('financials', e => setText('full-analysis-financials', JSON.parse(e.data).text));
+    source.addEventListener('technicals', e => setText('full-analysis-technicals', JSON.parse(e.data).text));
+    source.addEventListener('news', e => {
+        const data = JSON.parse(e.data);
+        document.getElementById('full-analysis-news').innerHTML = data.news
+            .map(item => `<li><a href="${item.url}" target="_blank">${item.title}</a></li>`).join('');
+    });
+    source.addEventListener('analysis', e => {
+        analysisText += JSON.parse(e.data).text;
+        setText('full-analysis-ai', analysisText);
+    });
+    source.addEventListener('error', e => {
+        if (e.data) {
+            console.error('Full analysis error:', JSON.parse(e.data).error);
+            setText('full-analysis-ai', `Error: ${JSON.parse(e.data).error}`);
+        }
+        source.close();
+    });
+    source.addEventListener('done', e => {
+        console.log("Full analysis stream finished");
+        showPartialNotice(fullAnalysisContent, JSON.parse(e.data));
+        source.close();
+    });
+}
+
+function getFullAnalysisJSON(ticker) {
     fetch('/get_full_analysis', {
         method: 'POST',
         headers: {
@@ -162,18 +329,29 @@ function updateStockChart(labels, data) {
     });
 }
 
-function updateSectorChart(sectorData) {
+function updateSectorChart(performance) {
     console.log("Updating sector chart");
+    // The major indices, plus the stock's own sector ETF when we track it
+    const rows = Object.assign({}, performance.indices);
+    if (performance.sector && performance.sectors[performance.sector]) {
+        rows[performance.sector] = performance.sectors[performance.sector];
+    }
+    const labels = Object.keys(rows);
+    const horizons = [
+        ['1d', 'rgba(75, 192, 192, 0.6)'],
+        ['1m', 'rgba(54, 162, 235, 0.6)'],
+        ['1y', 'rgba(153, 102, 255, 0.6)'],
+    ];
     const ctx = document.getElementById('sectorChart').getContext('2d');
     new Chart(ctx, {
         type: 'bar',
         data: {
-            labels: Object.keys(sectorData),
-            datasets: [{
-                label: 'Sector Performance',
-                data: Object.values(sectorData),
-                backgroundColor: 'rgba(75, 192, 192, 0.6)'
-            }]
+            labels: labels,
+            datasets: horizons.map(([horizon, color]) => ({
+                label: `${horizon} return (%)`,
+                data: labels.map(label => rows[label].returns[horizon]),
+                backgroundColor: color
+            }))
         },
         options: {
             responsive: true,
@@ -300,11 +478,16 @@ function updateCompetitorAnalysis(competitors) {
                 </tr>
             </thead>
             <tbody>
-                ${competitors.map(comp => `
+                ${competitors.map(comp => comp.status !== 'ready' ? `
                     <tr>
                         <td>${comp.name}</td>
-                        <td>$${comp.price.toFixed(2)}</td>
-                        <td>$${(comp.marketCap / 1e9).toFixed(2)}B</td>
+                        <td colspan="3">${comp.status === 'pending' ? 'Loading…' : 'Unavailable'}</td>
+                    </tr>
+                ` : `
+                    <tr>
+                        <td>${comp.name}</td>
+                        <td>${comp.price ? '$' + comp.price.toFixed(2) : 'N/A'}</td>
+                        <td>${comp.marketCap ? '$' + (comp.marketCap / 1e9).toFixed(2) + 'B' : 'N/A'}</td>
                         <td>${comp.peRatio ? comp.peRatio.toFixed(2) : 'N/A'}</td>
                     </tr>
                 `).join('')}
@@ -313,6 +496,36 @@ function updateCompetitorAnalysis(competitors) {
     `;
 }
 
+function updateWatchlist(rows) {
+    console.log("Updating watchlist");
+    const fmt = (value, digits = 2) => value === null ? 'N/A' : value.toFixed(digits);
+    const table = document.getElementById('watchlist-table');
+    table.innerHTML = `
+        <thead>
+            <tr><th>Ticker</th><th>Name</th><th>Price</th><th>Change</th><th>SMA 50</th><th>SMA 200</th><th>RSI</th></tr>
+        </thead>
+        <tbody>
+            ${rows.map(row => `
+                <tr data-ticker="${row.ticker}">
+                    <td>${row.ticker}</td>
+                    <td>${row.name}</td>
+                    <td>${row.price === null ? 'N/A' : '$' + fmt(row.price)}</td>
+                    <td style="color: ${row.change >= 0 ? 'green' : 'red'}">${row.change === null ? 'N/A' : fmt(row.change * 100) + '%'}</td>
+                    <td>${fmt(row.sma_50)}</td>
+                    <td>${fmt(row.sma_200)}</td>
+                    <td>${fmt(row.rsi)}</td>
+                </tr>
+            `).join('')}
+        </tbody>
+    `;
+    table.querySelectorAll('tr[data-ticker]').forEach(tr => {
+        tr.addEventListener('click', () => {
+            document.getElementById('ticker-input').value = tr.dataset.ticker;
+            getStockData(tr.dataset.ticker);
+        });
+    });
+}
+
 function updateAIAnalysis(analysis) {
     console.log("Updating AI analysis");
     document.getElementById('ai-response').innerHTML = analysis.replace(/\n/g, '<br>');
@@ -333,4 +546,16 @@ function updateFullAnalysis(data) {
             ${data.news.map(item => `<li><a href="${item.url}" target="_blank">${item.title}</a></li>`).join('')}
         </ul>
     `;
+    showPartialNotice(fullAnalysisContent, data);
+}
+
+function showPartialNotice(container, data) {
+    // Sections that failed or ran out of time were sent as placeholders
+    if (!data.partial) {
+        return;
+    }
+    const notice = document.createElement('p');
+    notice.className = 'partial-notice';
+    notice.textContent = `Some sections could not be loaded in time (${Object.keys(data.missing).join(', ')}). Try again shortly for the full analysis.`;
+    container.prepend(notice);
 }
\ No newline at end of file
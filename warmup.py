@@ -0,0 +1,42 @@
+import importlib
+import logging
+import os
+from urllib.parse import urlsplit
+
+# Heavy modules imported lazily by the app; a pre-fork master imports them
+# up front so every worker shares the pages copy-on-write instead of paying
+# for them on its first request.
+HEAVY_MODULES = ('pandas', 'yfinance', 'textblob', 'anthropic')
+WARMUP_CONNECTIONS = os.getenv("WARMUP_CONNECTIONS", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+
+def warm_master():
+    """Process-independent start-up work, safe to do before forking."""
+    import app
+
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    # TextBlob reads its sentiment lexicon on first use
+    app.textblob.TextBlob("warm up").sentiment
+    # Compile the page template once rather than in every worker
+    with app.app.test_request_context('/'):
+        app.render_template('index.html')
+
+
+def warm_worker():
+    """Per-process start-up work that must not cross a fork: the Anthropic
+    client and open connections in the HTTP pools."""
+    import app
+    import news
+
+    app.get_client()
+    if not WARMUP_CONNECTIONS:
+        return
+    parts = urlsplit(news.NEWS_API_URL)
+    try:
+        # Any response will do; this only pays for DNS and the TLS handshake now
+        news.session.head(f"{parts.scheme}://{parts.netloc}/", timeout=news.NEWS_TIMEOUT)
+    except Exception:
+        logger.info("Could not pre-connect to %s", parts.netloc, exc_info=True)